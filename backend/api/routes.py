@@ -1,18 +1,65 @@
+import json
+
+from typing import Optional
+
 from fastapi import APIRouter, Request
-from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from services import query_service
-from services import layer_store
-from core import mvt_builder
+from services import tile_service
+from services import rows_service
+from services import static_tiles
+from services import layer_store, tile_cache, sweeper
+from core import tile_encoding, query_builder
 
-from db.db import execute_sql
+from db.async_db import execute_sql
 
 router = APIRouter()
 
+TILE_MAX_AGE = 3600          # Cache tiles for 1 hour
+STATIC_TILE_MAX_AGE = 86400  # Pre-rendered tiles change only when the ETL re-renders
+
 @router.post("/query")
 async def handle_query(req: Request):
     data = await req.json()
     prompt = data.get("prompt", "")
-    return query_service.handle_user_query(prompt)
+    # Pipeline is synchronous (embedding + LLM + DB), keep it off the event loop
+    return await run_in_threadpool(query_service.handle_user_query, prompt)
+
+@router.post("/query/stream")
+async def handle_query_stream(req: Request):
+    data = await req.json()
+    prompt = data.get("prompt", "")
+
+    # NDJSON: one event per line; the sync generator is iterated in a threadpool
+    events = (
+        json.dumps(jsonable_encoder(event)) + "\n"
+        for event in query_service.stream_user_query(prompt)
+    )
+    return StreamingResponse(events, media_type="application/x-ndjson")
+
+@router.get("/plan/{plan_id}")
+async def get_plan(plan_id: str):
+    plan = await run_in_threadpool(query_service.get_plan_params, plan_id)
+    if plan is None:
+        return Response(content=b"", status_code=404)
+    return plan
+
+@router.post("/plan/execute")
+async def execute_plan(req: Request):
+    data = await req.json()
+    plan_id = data.get("plan_id", "")
+    params = data.get("params") or {}
+
+    # Re-runs a stored plan with new parameter values: DB only, no embedding or LLM
+    try:
+        result = await run_in_threadpool(query_service.execute_plan, plan_id, params)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if result is None:
+        return JSONResponse({"error": f"Unknown or expired plan: {plan_id}"}, status_code=404)
+    return result
 
 # @router.post("/manual_query")
 # async def handle_manual_query(req: Request):
@@ -23,13 +70,13 @@ async def handle_query(req: Request):
 @router.get("/examples")
 async def get_examples(limit: int=999):
     sql = f"SELECT user_query FROM meta.example_embeddings LIMIT {limit};"
-    rows = execute_sql(sql)
+    rows = await execute_sql(sql)
     return rows
 
 @router.get("/schemas")
 async def get_schemas():
     sql = f"SELECT table_name, column_name, col_type, description FROM meta.schema_embeddings ORDER BY table_name, column_name;"
-    rows = execute_sql(sql)
+    rows = await execute_sql(sql)
     
     schemas = {}
     for row in rows: 
@@ -43,46 +90,95 @@ async def get_schemas():
 
     return schemas
 
+@router.get("/stats")
+async def get_stats():
+    # Per-process metrics (each worker reports its own caches)
+    return {
+        "layer_store": await run_in_threadpool(layer_store.stats),
+        "plan_templates": query_builder.template_cache_stats(),
+        "sweeper": sweeper.stats(),
+        "tile_cache": tile_cache.stats(),
+        "tiles": tile_service.stats(),
+    }
+
+@router.get("/layers/{layer_id}/rows")
+async def get_layer_rows(layer_id: str, after: Optional[int] = None, limit: int = 100):
+    page = await rows_service.get_rows(layer_id, after, limit)
+    if page is None:
+        return Response(content=b"", status_code=404)
+    return page
+
+@router.get("/tiles/static/{table}/{z}/{x}/{y}.pbf")
+async def get_static_tile(table: str, z: int, x: int, y: int, req: Request):
+    version = static_tiles.version(table)
+    if version is None:
+        return Response(content=b"", status_code=404, media_type="application/x-protobuf")
+
+    # Memory-mapped SQLite read, cheap enough to run on the event loop. Read before the
+    # ETag check, since the stored encoding decides which variant the client would get
+    mvt_data = static_tiles.get_tile(table, z, x, y)
+    if mvt_data is None:
+        return Response(content=b"", status_code=404, media_type="application/x-protobuf")
+
+    encoding = tile_encoding.sniff(mvt_data)
+    etag = tile_encoding.variant_etag(
+        tile_encoding.etag("static", table, version, z, x, y), req.headers.get("accept-encoding", ""), encoding
+    )
+    if tile_encoding.matches(req.headers.get("if-none-match"), etag):
+        return _not_modified(etag, STATIC_TILE_MAX_AGE)
+
+    return _tile_response(req, mvt_data, encoding, etag, STATIC_TILE_MAX_AGE)
+
 @router.get("/tiles/{layer_id}/{z}/{x}/{y}.pbf")
-async def get_tile(layer_id: str, z: int, x: int, y: int):
-    # Retrieve the stored query for this layer
+async def get_tile(layer_id: str, z: int, x: int, y: int, req: Request):
     print(f"[Route] Requesting {layer_id}, {z}, {x}, {y}")
-    layer_data = layer_store.get_layer(layer_id)
+    tile = await tile_service.get_tile(
+        layer_id, z, x, y, req.headers.get("if-none-match"), req.headers.get("accept-encoding", "")
+    )
     
-    if not layer_data:
+    if tile is None:
         print(f"[Route] Route {layer_id} not found")
         return Response(
             content=b"",
             status_code=404,
             media_type="application/x-protobuf"
         )
+
+    if tile["not_modified"]:
+        # Client already has these bytes - no SQL was run
+        return _not_modified(tile["etag"], TILE_MAX_AGE)
     
-    base_query = layer_data["sql"]
-    layer_name = layer_data["name"]
-    
-    # Build MVT query for this specific tile
-    mvt_query = mvt_builder.build_mvt_query(base_query, layer_name, z, x, y)
-    
-    # Execute query to get MVT binary data
-    rows = execute_sql(mvt_query)
-    
-    if not rows or not rows[0].get("mvt"):
+    return _tile_response(req, tile["data"], tile_encoding.ENCODING, tile["etag"], TILE_MAX_AGE)
+
+def _tile_headers(etag: Optional[str], max_age: int) -> dict:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+def _not_modified(etag: str, max_age: int) -> Response:
+    return Response(status_code=304, headers=_tile_headers(etag, max_age))
+
+def _tile_response(req: Request, data: bytes, encoding: Optional[str], etag: Optional[str], max_age: int) -> Response:
+    if not data:
         # No features in this tile - return empty tile
         return Response(
             content=b"",
             status_code=204,
             media_type="application/x-protobuf"
         )
-    
-    # Return the MVT binary data
-    mvt_data = bytes(rows[0]["mvt"])
-    print(f"[Route] mvt_data length: {len(mvt_data)}")
-    
-    return Response(
-        content=mvt_data,
-        media_type="application/x-protobuf",
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Cache-Control": "public, max-age=3600"  # Cache tiles for 1 hour
-        }
-    )
\ No newline at end of file
+
+    headers = _tile_headers(etag, max_age)
+    if encoding and tile_encoding.accepts(req.headers.get("accept-encoding", ""), encoding):
+        # Stored compressed, sent as-is
+        headers["Content-Encoding"] = encoding
+    elif encoding:
+        # The etag is already the identity variant's (tile_encoding.variant_etag)
+        data = tile_encoding.decode(data, encoding)
+
+    print(f"[Route] mvt_data length: {len(data)}")
+    return Response(content=data, media_type="application/x-protobuf", headers=headers)
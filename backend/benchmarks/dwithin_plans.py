@@ -0,0 +1,98 @@
+"""
+ST_DWithin plan benchmark
+
+Builds every example plan in db/etl/examples that uses a distance predicate twice,
+with and without the planar bbox prefilter (query_builder.DWITHIN_PREFILTER), and
+prints the planner cost, the scan/join nodes and whether a GiST index is used.
+
+Run from backend/ against a loaded database:
+    python -m benchmarks.dwithin_plans [--analyze] [--examples ../db/etl/examples]
+
+--analyze executes the queries (EXPLAIN ANALYZE) and reports actual runtimes.
+"""
+
+import argparse
+import json
+import os
+
+from core import query_builder
+from db.db import execute_sql
+
+DEFAULT_EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "..", "db", "etl", "examples")
+
+
+def load_examples(path: str):
+    for file in sorted(os.listdir(path)):
+        if not file.endswith(".json"):
+            continue
+        with open(os.path.join(path, file)) as f:
+            example = json.load(f)
+        if "ST_DWithin" in json.dumps(example["plan"]):
+            yield file, example
+
+
+def build(plan, prefilter: bool):
+    previous = query_builder.DWITHIN_PREFILTER
+    query_builder.DWITHIN_PREFILTER = prefilter
+    try:
+        return query_builder.build_query(plan)
+    finally:
+        query_builder.DWITHIN_PREFILTER = previous
+
+
+def explain(sql: str, analyze: bool):
+    options = "ANALYZE, FORMAT JSON" if analyze else "FORMAT JSON"
+    rows = execute_sql(f"EXPLAIN ({options}) {sql.strip().rstrip(';')};")
+    if not rows:
+        return None
+    return rows[0]["QUERY PLAN"][0]
+
+
+def summarize(explained):
+    """ Total cost, actual time (if analyzed) and the distinct scan/join node types. """
+    nodes, indexes = [], set()
+
+    def walk(node):
+        nodes.append(node["Node Type"])
+        if "Index Name" in node:
+            indexes.add(node["Index Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(explained["Plan"])
+    return {
+        "cost": explained["Plan"]["Total Cost"],
+        "time_ms": explained.get("Execution Time"),
+        "nodes": sorted(set(n for n in nodes if "Scan" in n or "Loop" in n or "Join" in n)),
+        "indexes": sorted(indexes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--analyze", action="store_true", help="Execute queries and report actual times")
+    parser.add_argument("--examples", default=DEFAULT_EXAMPLES, help="Directory of example plan JSON files")
+    args = parser.parse_args()
+
+    for file, example in load_examples(args.examples):
+        print(f"\n=== {file}: {example['user_query']}")
+        before = build(example["plan"], prefilter=False)
+        after = build(example["plan"], prefilter=True)
+
+        for i, (sql_before, sql_after) in enumerate(zip(before, after)):
+            if sql_before == sql_after:
+                continue
+            for label, sql in (("geography only", sql_before), ("bbox prefilter", sql_after)):
+                explained = explain(sql, args.analyze)
+                if explained is None:
+                    print(f"  layer {i} [{label}]: EXPLAIN failed")
+                    continue
+                s = summarize(explained)
+                timing = f", {s['time_ms']:.1f} ms" if s["time_ms"] is not None else ""
+                print(f"  layer {i} [{label}]: cost {s['cost']:.0f}{timing}")
+                print(f"      nodes: {', '.join(s['nodes'])}")
+                print(f"      indexes: {', '.join(s['indexes']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,6 @@ import os
 from dotenv import load_dotenv
 from pathlib import Path
 
-import psycopg2
-
 DEBUG_MODE = True
 
 # Connect to the database
@@ -13,4 +11,71 @@ DB_CONFIG = {
     "password": os.getenv("POSTGRES_PASSWORD"),
     "host": os.getenv("DB_HOST"),
     "port": os.getenv("DB_PORT"),
-}
\ No newline at end of file
+}
+
+# Tile cache
+TILE_CACHE_MAX_BYTES = int(os.getenv("TILE_CACHE_MAX_BYTES", 256 * 1024 * 1024))  # 256 MB in memory
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR")  # Optional disk tier, disabled when unset
+TILE_CACHE_DISK_MAX_BYTES = int(os.getenv("TILE_CACHE_DISK_MAX_BYTES", 2 * 1024 * 1024 * 1024))  # 2 GB on disk
+
+# Sync connection pool (plans, layer summaries, embeddings)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+
+# Prepared statements (both pools): a query text is prepared on a connection after this
+# many executions there; each connection keeps up to DB_PREPARED_MAX of them (LRU)
+DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", 2))
+DB_PREPARED_MAX = int(os.getenv("DB_PREPARED_MAX", 256))
+
+# Async connection pool (tiles, schemas, examples)
+ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", 2))
+ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", 20))
+
+# LLM client (any OpenAI-compatible Chat Completions API, e.g. a local mock server)
+LLM_API_BASE = os.getenv("LLM_API_BASE", "https://api.openai.com/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY", os.getenv("OPENAI_API_KEY"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", 5))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", 60))  # Per read, so streams only fail when tokens stop arriving
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))  # Backoff: uniform(0, base * 2^attempt)
+LLM_POOL_MAX = int(os.getenv("LLM_POOL_MAX", 20))
+
+# Plan cache (NL question -> JSON plan)
+PLAN_CACHE_TTL_SECONDS = int(os.getenv("PLAN_CACHE_TTL_SECONDS", 3600))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", 1000))
+PLAN_CACHE_MAX_DISTANCE = float(os.getenv("PLAN_CACHE_MAX_DISTANCE", 0.01))  # Cosine distance for near-duplicates, 0 disables
+PLAN_CACHE_CORPUS_CHECK_SECONDS = int(os.getenv("PLAN_CACHE_CORPUS_CHECK_SECONDS", 60))
+
+# In-memory vector index (schema + example retrieval)
+VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "true").lower() == "true"
+VECTOR_INDEX_CHECK_SECONDS = int(os.getenv("VECTOR_INDEX_CHECK_SECONDS", 60))  # Corpus change polling interval
+
+# Multi-layer plan execution
+PLAN_PARALLELISM = int(os.getenv("PLAN_PARALLELISM", 4))  # Layers executed concurrently per plan (keep below pool size)
+PLAN_DEADLINE_SECONDS = float(os.getenv("PLAN_DEADLINE_SECONDS", 60))  # Layers still running after this are dropped
+
+# Attribute table paging
+ROWS_PAGE_SIZE = int(os.getenv("ROWS_PAGE_SIZE", 100))  # Rows returned inline with /query
+ROWS_PAGE_MAX = int(os.getenv("ROWS_PAGE_MAX", 1000))    # Largest page the rows endpoint serves
+
+# Tiles
+TILE_MAX_ZOOM = int(os.getenv("TILE_MAX_ZOOM", 16))  # Clients overzoom past this, no finer tiles are useful
+STATIC_TILES_DIR = os.getenv("STATIC_TILES_DIR")  # MBTiles from `run_etl.py tiles`, disabled when unset
+TILE_DB_CONCURRENCY = int(os.getenv("TILE_DB_CONCURRENCY", 10))  # Tile queries at once (keep below ASYNC_DB_POOL_MAX)
+TILE_ENCODING = os.getenv("TILE_ENCODING", "gzip")  # Cached tile compression: gzip, or br (needs the brotli package)
+METATILE_SIZE = int(os.getenv("METATILE_SIZE", 4))          # Render N x N blocks of tiles per query, 1 disables
+METATILE_MIN_ZOOM = int(os.getenv("METATILE_MIN_ZOOM", 12))  # Below this, tiles are rendered one at a time
+STATIC_FILTER_MAX_IDS = int(os.getenv("STATIC_FILTER_MAX_IDS", 100000))  # Larger filtered layers use SQL tiles
+
+# Layer materialization (expensive layers served from an indexed unlogged table)
+MATERIALIZE_ENABLED = os.getenv("MATERIALIZE_ENABLED", "true").lower() == "true"
+MATERIALIZE_MIN_SECONDS = float(os.getenv("MATERIALIZE_MIN_SECONDS", 0.5))  # Measured full-layer runtime
+MATERIALIZE_MIN_COST = float(os.getenv("MATERIALIZE_MIN_COST", 100000))     # Planner total cost, 0 disables
+MATERIALIZE_TTL_SECONDS = int(os.getenv("MATERIALIZE_TTL_SECONDS", 1800))
+
+# Layer store (layer SQL + metadata shared by tiles and rows pages)
+LAYER_STORE_BACKEND = os.getenv("LAYER_STORE_BACKEND", "memory")  # memory | postgres | redis (multi-worker needs postgres/redis)
+LAYER_STORE_LOCAL_TTL_SECONDS = float(os.getenv("LAYER_STORE_LOCAL_TTL_SECONDS", 10))  # Per-process read cache for shared backends
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+PLAN_STORE_TTL_SECONDS = int(os.getenv("PLAN_STORE_TTL_SECONDS", 86400))  # Executed plans kept for /plan/execute (same backend)
+SWEEP_INTERVAL_SECONDS = float(os.getenv("SWEEP_INTERVAL_SECONDS", 30))  # Background expiry of layers and materializations
@@ -1,50 +1,25 @@
-import requests
 import re
 import json
-import os
+from typing import Any, Dict, Iterator, Tuple
+
+from core import llm_client
 
-#OLLAMA_API_URL = os.getenv("LLM_API_URL")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = "gpt-4o-mini"
 
+SQL_SYSTEM_PROMPT = "You are a SQL expert who generates PostGIS queries."
+PLAN_SYSTEM_PROMPT = "You are an expert who generates JSON plans from templates."
+
+def _messages(system: str, prompt: str):
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
+
 def generate_sql(prompt) -> str:
     """
     Generates SQL from a user/system prompt using OpenAI Chat Completions API.
     """
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    data = {
-        "model": OPENAI_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a SQL expert who generates PostGIS queries."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0,  
-        "max_tokens": 1024
-    }
-
-    res = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=data)
-    res.raise_for_status()
-    raw_response = res.json()["choices"][0]["message"]["content"]
-
-    # model = "llama3.2"
-    # res = requests.post(
-    #     OLLAMA_API_URL,
-    #     json={
-    #         "model": model,
-    #         "prompt": prompt,
-    #         "stream": False
-    #     }
-    # )
-    # raw_response = res.json()["response"]
-
-    #print("[DEBUG] URL:", llm_api)
-    #print(f"(LLM)[DEBUG] Model: {model}")
-    print("[DEBUG] Status code:", res.status_code)
-    print("[DEBUG] Response text:", res.text)
+    raw_response = llm_client.chat(_messages(SQL_SYSTEM_PROMPT, prompt), OPENAI_MODEL)
     print(f"(LLM)[DEBUG] Raw response:\n{raw_response}")
 
     match = re.search(r"(SELECT[\s\S]+?;)", raw_response, re.IGNORECASE)
@@ -55,29 +30,24 @@ def generate_sql(prompt) -> str:
 
     return raw_response
 
-def generate_json_plan(prompt):
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    data = {
-        "model": OPENAI_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are an expert who generates JSON plans from templates."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0,  
-        "max_tokens": 1024
-    }
-
-    res = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=data)
-    res.raise_for_status()
-    raw_response = res.json()["choices"][0]["message"]["content"]
-
+def _parse_plan(raw_response: str) -> Dict[str, Any]:
     # Convert str to dict
-    response_cleaned = raw_response.lstrip("`").lstrip("json").rstrip("`").strip()
+    response_cleaned = raw_response.strip().lstrip("`").lstrip("json").rstrip("`").strip()
     #print(f"[LLM] Response: {response_cleaned}")
-    plan_dict = json.loads(response_cleaned)
+    return json.loads(response_cleaned)
+
+def generate_json_plan(prompt):
+    raw_response = llm_client.chat(_messages(PLAN_SYSTEM_PROMPT, prompt), OPENAI_MODEL)
+    return _parse_plan(raw_response)
+
+def stream_json_plan(prompt) -> Iterator[Tuple[str, Any]]:
+    """
+    Streams plan generation. Yields ("layer", layer) as soon as each layer object in the
+    plan's "layers" array is complete, then ("plan", plan) with the whole parsed plan.
+    """
+    parser = llm_client.PlanLayerParser()
+    for chunk in llm_client.stream_chat(_messages(PLAN_SYSTEM_PROMPT, prompt), OPENAI_MODEL):
+        for layer in parser.feed(chunk):
+            yield "layer", layer
 
-    return plan_dict
\ No newline at end of file
+    yield "plan", _parse_plan(parser.text())
@@ -0,0 +1,221 @@
+"""
+LLM Client Module
+
+Chat Completions client on pooled HTTP connections (httpx), shared by every request:
+connections and TLS sessions are reused, every call has bounded connect/read timeouts,
+and transient failures (connection errors, timeouts, 429, 5xx) are retried with
+jittered exponential backoff. Blocking calls for the threadpool pipeline, with token
+streaming (SSE).
+
+LLM_API_BASE points the client at any OpenAI-compatible server, e.g. a local mock
+server in tests: LLM_API_BASE=http://localhost:8081/v1.
+"""
+
+import json
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from config.settings import (
+    LLM_API_BASE,
+    LLM_API_KEY,
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_READ_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_POOL_MAX,
+)
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRY_MAX_SLEEP_SECONDS = 10.0
+
+_timeout = httpx.Timeout(LLM_READ_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+_limits = httpx.Limits(max_connections=LLM_POOL_MAX, max_keepalive_connections=LLM_POOL_MAX)
+_headers = {"Authorization": f"Bearer {LLM_API_KEY}"} if LLM_API_KEY else {}
+
+# One client for the threadpool pipeline, shared across requests
+_client = httpx.Client(base_url=LLM_API_BASE, timeout=_timeout, limits=_limits, headers=_headers)
+
+
+class LLMError(Exception):
+    """ The LLM request failed after all retries, or returned an unusable response. """
+
+
+def _body(messages: List[Dict[str, str]], model: str, stream: bool, **options) -> Dict[str, Any]:
+    return {"model": model, "messages": messages, "temperature": 0, "max_tokens": 1024, **options, "stream": stream}
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """ Full-jitter exponential backoff, or the server's Retry-After when it sends one. """
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_SLEEP_SECONDS)
+        except ValueError:
+            pass
+    return random.uniform(0, min(RETRY_MAX_SLEEP_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+def _retryable(response: httpx.Response) -> bool:
+    return response.status_code in RETRY_STATUSES
+
+
+def _content(response: httpx.Response) -> str:
+    try:
+        return response.json()["choices"][0]["message"]["content"]
+    except (ValueError, KeyError, IndexError) as e:
+        raise LLMError(f"Unexpected LLM response: {response.text[:200]}") from e
+
+
+def _sse_delta(line: str) -> Optional[str]:
+    """ Token text from one SSE line of a streamed completion ("" for keep-alives/role chunks, None at [DONE]). """
+    if not line.startswith("data:"):
+        return ""
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return None
+    try:
+        choices = json.loads(data).get("choices") or [{}]
+    except ValueError:
+        return ""
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+# --- Sync ---
+def chat(messages: List[Dict[str, str]], model: str, **options) -> str:
+    """ Completion text for a chat. Raises LLMError once retries are exhausted. """
+    body = _body(messages, model, stream=False, **options)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        response = None
+        try:
+            response = _client.post("/chat/completions", json=body)
+            if not _retryable(response):
+                response.raise_for_status()
+                return _content(response)
+            error = f"HTTP {response.status_code}"
+        except httpx.TransportError as e:  # Connect/read timeouts, resets
+            error = repr(e)
+        except httpx.HTTPStatusError as e:
+            raise LLMError(f"LLM request failed: HTTP {e.response.status_code}: {e.response.text[:200]}") from e
+
+        if attempt < LLM_MAX_RETRIES:
+            delay = _retry_delay(attempt, response)
+            print(f"[LLM] Attempt {attempt + 1} failed ({error}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+    raise LLMError(f"LLM request failed after {LLM_MAX_RETRIES + 1} attempt(s): {error}")
+
+
+def stream_chat(messages: List[Dict[str, str]], model: str, **options) -> Iterator[str]:
+    """
+    Yields completion text as tokens arrive. Failures before the first token are
+    retried like chat(); after that the partial output can't be replayed, so they raise.
+    """
+    body = _body(messages, model, stream=True, **options)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        response = None
+        started = False
+        try:
+            with _client.stream("POST", "/chat/completions", json=body) as response:
+                if not _retryable(response):
+                    if response.is_error:
+                        response.read()
+                        raise LLMError(f"LLM request failed: HTTP {response.status_code}: {response.text[:200]}")
+                    for line in response.iter_lines():
+                        delta = _sse_delta(line)
+                        if delta is None:
+                            return
+                        if delta:
+                            started = True
+                            yield delta
+                    return
+                error = f"HTTP {response.status_code}"
+        except httpx.TransportError as e:
+            if started:
+                raise LLMError(f"LLM stream interrupted: {e!r}") from e
+            error = repr(e)
+
+        if attempt < LLM_MAX_RETRIES:
+            delay = _retry_delay(attempt, response)
+            print(f"[LLM] Stream attempt {attempt + 1} failed ({error}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+    raise LLMError(f"LLM stream failed after {LLM_MAX_RETRIES + 1} attempt(s): {error}")
+
+
+# --- Incremental plan parsing ---
+class PlanLayerParser:
+    """
+    Incremental scanner over streamed plan JSON: feed() returns each element of the
+    top-level "layers" array as soon as its closing brace arrives, so layers can be
+    built while the rest of the plan is still being generated. Text outside the JSON
+    (e.g. ```json fences) is ignored; text() is everything fed so far.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None        # Last string seen directly inside the top-level object
+        self._layers_depth = None    # Depth inside the "layers" array, once it is open
+        self._element_start = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._chunks.append(chunk)
+        self._buffer += chunk
+        completed = []
+
+        for i in range(self._pos, len(self._buffer)):
+            char = self._buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = self._buffer[self._string_start + 1:i]
+                continue
+
+            if char == '"' and self._depth > 0:
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                if char == "[" and self._depth == 1 and self._last_key == "layers" and self._layers_depth is None:
+                    self._layers_depth = self._depth + 1
+                elif char == "{" and self._depth == self._layers_depth:
+                    self._element_start = i
+                self._depth += 1
+            elif char in "}]" and self._depth > 0:
+                self._depth -= 1
+                if char == "}" and self._depth == self._layers_depth and self._element_start is not None:
+                    completed.append(json.loads(self._buffer[self._element_start:i + 1]))
+                    self._element_start = None
+                elif char == "]" and self._layers_depth is not None and self._depth == self._layers_depth - 1:
+                    self._layers_depth = -1  # Array closed; later arrays aren't layers
+
+        # Keep only the unfinished layer (if any) in the scan buffer
+        keep_from = self._element_start if self._element_start is not None else len(self._buffer)
+        if self._in_string and self._depth == 1:
+            keep_from = min(keep_from, self._string_start)
+        self._shift(keep_from)
+        return completed
+
+    def _shift(self, offset: int):
+        self._buffer = self._buffer[offset:]
+        if self._element_start is not None:
+            self._element_start -= offset
+        if self._string_start is not None:
+            self._string_start -= offset
+        self._pos = len(self._buffer)
+
+    def text(self) -> str:
+        return "".join(self._chunks)
@@ -1,5 +1,57 @@
 import math
-from typing import Tuple
+from typing import Any, Dict, Optional, Tuple
+
+TILE_BUFFER = 256     # Pixels beyond the tile edge included by ST_AsMVTGeom
+TILE_EXTENT = 4096    # MVT tile resolution
+TILE_SIZE_PX = 256    # Display size of a tile on the client
+
+# Precomputed geometry bands written by the ETL transforms (tiles.<table>): for each
+# band, the highest zoom it serves and its column of simplified EPSG:3857 geometry.
+# Tolerances match _get_simplification_tolerance, so banded tiles look the same.
+TILE_SCHEMA = "tiles"
+GEOMETRY_BANDS = ((5, "geom_z5"), (10, "geom_z10"), (14, "geom_z14"), (22, "geom_z22"))
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """ (west, south, east, north) of an XYZ tile in EPSG:4326 degrees. """
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def tile_intersects(bounds, z: int, x: int, y: int) -> bool:
+    """ Whether a layer's [xmin, ymin, xmax, ymax] can contribute features to a tile (buffer included). """
+    west, south, east, north = tile_bounds(z, x, y)
+    pad_x = (east - west) * TILE_BUFFER / TILE_EXTENT
+    pad_y = (north - south) * TILE_BUFFER / TILE_EXTENT
+    xmin, ymin, xmax, ymax = bounds
+    return not (
+        xmax < west - pad_x or xmin > east + pad_x or
+        ymax < south - pad_y or ymin > north + pad_y
+    )
+
+
+def useful_zoom_range(bounds: Optional[list], max_zoom: int, polygonal: bool = False) -> Tuple[int, int]:
+    """
+    (minzoom, maxzoom) worth rendering for a layer. Below minzoom a polygon layer's whole
+    extent spans less than one pixel; above max_zoom clients overzoom the max_zoom tiles.
+    Points and lines are drawn as markers/strokes at any size, so layers with any (polygonal
+    False) are visible at every zoom, as are point-like extents (zero width and height).
+    """
+    if not bounds or not polygonal:
+        return 0, max_zoom
+
+    xmin, ymin, xmax, ymax = bounds
+    width_deg = max(xmax - xmin, ymax - ymin)
+    if width_deg <= 0:
+        return 0, max_zoom
+
+    # Pixels spanned at z: width_deg / 360 * TILE_SIZE_PX * 2^z >= 1
+    minzoom = math.ceil(math.log2(360.0 / (width_deg * TILE_SIZE_PX)))
+    return max(0, min(minzoom, max_zoom)), max_zoom
 
 def _get_simplification_tolerance(z: int) -> float:
     if z <= 5:
@@ -12,7 +64,26 @@ def _get_simplification_tolerance(z: int) -> float:
         return 0.000001   # Street level detail - minimal simplification
 
 
-def build_mvt_query(base_query: str, layer_name: str, z: int, x: int, y: int) -> str:
+def _base(base_query: str) -> str:
+    # Tile coordinates are bound parameters, so literal % in the layer SQL must be escaped
+    return base_query.strip().rstrip(";").replace("%", "%%")
+
+
+def _get_band_column(z: int) -> str:
+    for max_zoom, column in GEOMETRY_BANDS:
+        if z <= max_zoom:
+            return column
+    return GEOMETRY_BANDS[-1][1]
+
+
+def build_mvt_query(base_query: str, layer_name: str, z: int, x: int, y: int, geometry_source: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    (sql, params) rendering one tile. z/x/y are bound, so every tile of a layer (per
+    simplification band) shares one statement that connections prepare once and reuse.
+    """
+    if geometry_source:
+        return _build_banded_mvt_query(base_query, layer_name, z, x, y, geometry_source)
+
     tolerance = _get_simplification_tolerance(z)
     
     # Build the MVT query using PostGIS ST_AsMVT
@@ -24,10 +95,10 @@ def build_mvt_query(base_query: str, layer_name: str, z: int, x: int, y: int) ->
     mvt_query = f"""
     WITH 
     tile_bounds AS (
-        SELECT ST_TileEnvelope({z}, {x}, {y}) AS geometry
+        SELECT ST_TileEnvelope(%(z)s::int, %(x)s::int, %(y)s::int) AS geometry
     ),
     base_data AS (
-        {base_query[:-1]}
+        {_base(base_query)}
     ),
     tile_data AS (
         SELECT 
@@ -51,4 +122,100 @@ def build_mvt_query(base_query: str, layer_name: str, z: int, x: int, y: int) ->
     WHERE geometry IS NOT NULL;
     """
     
-    return mvt_query
\ No newline at end of file
+    return mvt_query, {"z": z, "x": x, "y": y}
+
+def _build_banded_mvt_query(base_query: str, layer_name: str, z: int, x: int, y: int, geometry_source: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    MVT query for a layer whose features are rows of a banded table (see GEOMETRY_BANDS).
+    The layer query only decides which ids are in the tile; geometry comes pre-simplified
+    and pre-projected from the band for z, filtered by that band's own GiST index.
+    """
+    band = _get_band_column(z)
+
+    mvt_query = f"""
+    WITH 
+    tile_bounds AS (
+        SELECT ST_TileEnvelope(%(z)s::int, %(x)s::int, %(y)s::int) AS geometry
+    ),
+    base_data AS (
+        {_base(base_query)}
+    ),
+    tile_data AS (
+        SELECT 
+            base_data.id,
+            ST_AsMVTGeom(
+                band.{band},
+                tile_bounds.geometry,
+                4096,  -- extent (tile resolution)
+                256,   -- buffer (pixels beyond tile edge)
+                true   -- clip geometries to tile bounds
+            ) AS geometry
+        FROM {geometry_source} AS band
+        JOIN tile_bounds
+        ON band.{band} && tile_bounds.geometry -- Band is already 3857, so no per-tile transform
+        JOIN base_data
+        ON base_data.id = band.id
+    )
+    SELECT ST_AsMVT(tile_data, '{layer_name}', 4096, 'geometry', 'id') AS mvt
+    FROM tile_data
+    WHERE geometry IS NOT NULL;
+    """
+
+    return mvt_query, {"z": z, "x": x, "y": y}
+
+
+def build_metatile_query(base_query: str, layer_name: str, z: int, x0: int, y0: int, size: int, geometry_source: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Renders the size x size block of tiles starting at (x0, y0) in one query, returning
+    one row (x, y, mvt) per tile. The layer query is run, filtered to the block and
+    simplified/projected once (MATERIALIZED), then cut into tiles - instead of once per tile.
+    """
+    last = 2 ** z - 1
+    x1, y1 = min(x0 + size - 1, last), min(y0 + size - 1, last)
+
+    if geometry_source:
+        band = _get_band_column(z)
+        block_data = f"""
+        SELECT base_data.id, band.{band} AS geometry
+        FROM {geometry_source} AS band
+        JOIN block ON band.{band} && block.geometry
+        JOIN ({_base(base_query)}) AS base_data ON base_data.id = band.id"""
+    else:
+        tolerance = _get_simplification_tolerance(z)
+        block_data = f"""
+        SELECT base_data.id, ST_Transform(ST_SimplifyPreserveTopology(base_data.geometry, {tolerance}), 3857) AS geometry
+        FROM ({_base(base_query)}) AS base_data
+        JOIN block ON base_data.geometry && ST_Transform(block.geometry, 4326)"""
+
+    mvt_query = f"""
+    WITH
+    tiles AS (
+        SELECT x, y, ST_TileEnvelope(%(z)s::int, x, y) AS geometry
+        FROM generate_series(%(x0)s::int, %(x1)s::int) AS x, generate_series(%(y0)s::int, %(y1)s::int) AS y
+    ),
+    block AS (
+        SELECT ST_Envelope(ST_Collect(ST_TileEnvelope(%(z)s::int, %(x0)s::int, %(y0)s::int), ST_TileEnvelope(%(z)s::int, %(x1)s::int, %(y1)s::int))) AS geometry
+    ),
+    block_data AS MATERIALIZED ({block_data}
+    )
+    SELECT tiles.x, tiles.y, (
+        SELECT ST_AsMVT(tile_data, '{layer_name}', 4096, 'geometry', 'id')
+        FROM (
+            SELECT 
+                block_data.id,
+                ST_AsMVTGeom(
+                    block_data.geometry,
+                    tiles.geometry,
+                    4096,  -- extent (tile resolution)
+                    256,   -- buffer (pixels beyond tile edge)
+                    true   -- clip geometries to tile bounds
+                ) AS geometry
+            FROM block_data
+            WHERE block_data.geometry && tiles.geometry
+        ) AS tile_data
+        WHERE tile_data.geometry IS NOT NULL
+    ) AS mvt
+    FROM tiles;
+    """
+
+    return mvt_query, {"z": z, "x0": x0, "y0": y0, "x1": x1, "y1": y1}
@@ -0,0 +1,126 @@
+"""
+MVT Filter Module
+
+Drops features from an encoded Mapbox Vector Tile by feature id, without a
+protobuf dependency. Only the fields needed to find each feature's id are
+decoded; everything else is copied through as raw bytes, so the kept features,
+keys, values and layer settings are byte-for-byte what PostGIS produced.
+
+Vector tile spec (v2) fields used here:
+    Tile:    3 = layers (repeated, length-delimited)
+    Layer:   1 = name (string), 2 = features (repeated, length-delimited)
+    Feature: 1 = id (uint64 varint)
+"""
+
+from typing import Iterator, Optional, Tuple
+
+TILE_LAYERS = 3
+LAYER_NAME = 1
+LAYER_FEATURES = 2
+FEATURE_ID = 1
+
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_BYTES = 2
+WIRE_FIXED32 = 5
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _fields(data: bytes) -> Iterator[Tuple[int, int, int, int, int]]:
+    """ Yields (field number, wire type, raw start, value start, end) for each field. """
+    pos = 0
+    while pos < len(data):
+        start = pos
+        key, pos = _read_varint(data, pos)
+        field, wire = key >> 3, key & 0x7
+
+        if wire == WIRE_VARINT:
+            value_start = pos
+            _, pos = _read_varint(data, pos)
+        elif wire == WIRE_BYTES:
+            length, value_start = _read_varint(data, pos)
+            pos = value_start + length
+        elif wire == WIRE_FIXED64:
+            value_start, pos = pos, pos + 8
+        elif wire == WIRE_FIXED32:
+            value_start, pos = pos, pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type: {wire}")
+
+        yield field, wire, start, value_start, pos
+
+
+def _bytes_field(field: int, payload: bytes) -> bytes:
+    return _write_varint((field << 3) | WIRE_BYTES) + _write_varint(len(payload)) + payload
+
+
+def _feature_id(feature: bytes) -> Optional[int]:
+    for field, wire, _, value_start, _ in _fields(feature):
+        if field == FEATURE_ID and wire == WIRE_VARINT:
+            return _read_varint(feature, value_start)[0]
+    return None
+
+
+def _filter_layer(layer: bytes, feature_ids, layer_name: Optional[str]) -> Tuple[bytes, int]:
+    """ Returns (re-encoded layer, features kept). """
+    out = bytearray()
+    kept = 0
+
+    for field, wire, start, value_start, end in _fields(layer):
+        if field == LAYER_FEATURES and wire == WIRE_BYTES:
+            if _feature_id(layer[value_start:end]) not in feature_ids:
+                continue
+            kept += 1
+        elif field == LAYER_NAME and wire == WIRE_BYTES and layer_name is not None:
+            out += _bytes_field(LAYER_NAME, layer_name.encode("utf-8"))
+            continue
+        out += layer[start:end]
+
+    return bytes(out), kept
+
+
+def filter_features(tile: bytes, feature_ids, layer_name: Optional[str] = None) -> bytes:
+    """
+    Returns the tile with only features whose id is in feature_ids, or b"" if none remain.
+    layer_name optionally renames every layer (clients select features by source-layer).
+    """
+    if not tile:
+        return b""
+
+    out = bytearray()
+    total = 0
+
+    for field, wire, start, value_start, end in _fields(tile):
+        if field == TILE_LAYERS and wire == WIRE_BYTES:
+            layer, kept = _filter_layer(tile[value_start:end], feature_ids, layer_name)
+            if not kept:
+                continue
+            total += kept
+            out += _bytes_field(TILE_LAYERS, layer)
+        else:
+            out += tile[start:end]
+
+    return bytes(out) if total else b""
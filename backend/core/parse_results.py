@@ -1,13 +1,21 @@
 import json
+import logging
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from db.db import execute_sql
-from services import layer_store
-from core import mvt_builder
+from config.settings import PLAN_PARALLELISM, PLAN_DEADLINE_SECONDS, ROWS_PAGE_SIZE, TILE_MAX_ZOOM, STATIC_FILTER_MAX_IDS
+from db.db import execute_sql, describe_sql
+from services import layer_store, materialize, static_tiles
+from core import mvt_builder, rows_builder, sql_canon
+
+# Base table -> its banded geometry table (or None), looked up once per process
+_band_tables = {}
 
 
 def _detect_geom_col(row):
-    for k, v in row.items():
+    # Accepts a row dict or a list of column names
+    for k in row:
         # Check for 'geometry' column name
         if k.lower() == 'geometry':
             return k
@@ -15,43 +23,274 @@ def _detect_geom_col(row):
     return None
 
 
-def parse_results(queries):
+def _layer_name(query, index):
+    # Extract layer name from query
+    match = re.search(r"\bfrom\s+([a-zA-Z0-9_\"\.]+)", query, re.IGNORECASE)
+    if match:
+        return match.group(1).replace('"', '')
+    return f"layer_{index + 1}"
+
+
+def register_layer(query, index, metadata=None):
+    """ Store the query for MVT tile generation and return its map-facing fields. """
+    layer_name = _layer_name(query, index)
+    layer_id = layer_store.create_layer(query, layer_name, metadata)
+
+    # Whole tables with a pre-rendered pyramid skip the dynamic tile path entirely
+    static_table = (metadata or {}).get("static_table")
+    tile_url = static_tiles.tile_url(static_table) if static_table else f"/api/tiles/{layer_id}/{{z}}/{{x}}/{{y}}.pbf"
+
+    return {
+        "name": layer_name,
+        "layer_id": layer_id,
+        "tile_url": tile_url,
+        "rows_url": f"/api/layers/{layer_id}/rows",
+    }
+
+
+def band_table(geometry_table):
+    """ Precomputed tiles.<table> for a layer's base table (see mvt_builder.GEOMETRY_BANDS), if the ETL built one. """
+    if not geometry_table:
+        return None
+
+    table = geometry_table.rpartition(".")[2]
+    if table not in _band_tables:
+        qualified = f"{mvt_builder.TILE_SCHEMA}.{table}"
+        rows = execute_sql("SELECT to_regclass(%s) IS NOT NULL AS present;", (qualified,))
+        if rows is None:
+            return None  # Lookup failed - try again next time
+        _band_tables[table] = qualified if rows[0]["present"] else None
+
+    return _band_tables[table]
+
+
+def tile_metadata(description):
+    """ Layer store fields that pick a layer's tile source, from a query_builder.describe_layers entry. """
+    geometry_table = description.get("geometry_table")
+    table = geometry_table.rpartition(".")[2] if geometry_table else None
+    pyramid = bool(table) and static_tiles.available(table)
+    unfiltered = bool(description.get("unfiltered"))
+
+    return {
+        "geometry_source": band_table(geometry_table),
+        # Whole table: the client reads the pyramid directly
+        "static_table": table if pyramid and unfiltered else None,
+        # Subset of the table: pyramid tiles with features outside the layer's id set dropped
+        "filter_table": table if pyramid and not unfiltered else None,
+    }
+
+
+def layer_metadata(data):
+    """ The parts of load_layer's result kept in the layer store (everything but the rows). """
+    return {k: data[k] for k in ("columns", "feature_count", "bounds", "minzoom", "maxzoom", "materialized_table")}
+
+
+def layer_summary(data):
+    """ The parts of load_layer's summary returned to clients (no materialized table or id set). """
+    return {k: data[k] for k in ("columns", "feature_count", "bounds", "minzoom", "maxzoom")}
+
+
+def split_rows(rows):
+    """ Returns (attribute column names, attribute rows) with geometry excluded. """
+    colnames = list(rows[0].keys())
+    geom_col = _detect_geom_col(rows[0])
+    
+    # Exclude geometry from attribute columns
+    prop_cols = [c for c in colnames if c != geom_col]
+    
+    # Build table rows (attributes only, no geometry)
+    table_rows = []
+    for row in rows:
+        table_rows.append([row.get(c) for c in prop_cols])
+
+    return prop_cols, table_rows
+
+
+def _source(query, table, template=None):
+    """ (sql, params) to read a layer from: its materialized table, else its template, else its plain SQL. """
+    if table:
+        return materialize.layer_sql({"sql": query, "materialized_table": table}), None
+    if template:
+        return template
+    return query, None
+
+
+def load_layer(query, deadline=None, collect_ids=False, known=None, template=None):
+    """
+    Summarizes one layer without fetching its geometry: attribute columns, feature count,
+    bounds and the first page of attribute rows (geometry projected out). Expensive
+    layers are materialized into an indexed table that tiles and pages read instead.
+    With collect_ids, layers of up to STATIC_FILTER_MAX_IDS features also get their
+    id set ("feature_ids") for filtering pre-rendered tiles.
+    known is the stored layer for the same SQL, if any: its summary (and id set) is
+    reused and only the first page is fetched.
+    template is the query's (sql_template, params) from query_builder.build_query_params:
+    when given, it is what runs, so same-shaped layers reuse prepared statements.
+    Returns None if any step fails or the deadline passes.
+    """
+    def remaining_ms():
+        return int((deadline - time.monotonic()) * 1000) if deadline else None
+
+    data = _reuse_summary(query, known) if known else None
+    if data is None:
+        data = _summarize(query, remaining_ms, template)
+    if data is None:
+        return None
+    if not data["feature_count"]:
+        return data
+
+    columns = data["columns"]
+    source, source_params = _source(query, data["materialized_table"], template)
+
+    # The filter runs once here; tiles then only need a set lookup per feature
+    if collect_ids and data["feature_ids"] is None and "id" in columns and data["feature_count"] <= STATIC_FILTER_MAX_IDS:
+        sql, params = rows_builder.build_id_set_query(source, source_params)
+        id_rows = execute_sql(sql, params, timeout_ms=remaining_ms())
+        if id_rows is not None:
+            data["feature_ids"] = frozenset(r["id"] for r in id_rows)
+
+    keyed = "id" in columns
+    sql, params = rows_builder.build_page_query(source, columns, limit=ROWS_PAGE_SIZE, keyed=keyed, base_params=source_params)
+    rows = execute_sql(sql, params, timeout_ms=remaining_ms())
+
+    tail_rows = None
+    if keyed and rows and len(rows) >= ROWS_PAGE_SIZE:
+        sql, params = rows_builder.build_id_rows_query(source, columns, rows[-1]["id"], source_params)
+        tail_rows = execute_sql(sql, params, timeout_ms=remaining_ms())
+
+    data["rows"], next_cursor = rows_builder.finish_page(rows, tail_rows, columns, ROWS_PAGE_SIZE)
+    data["next_cursor"] = next_cursor if keyed else None
+    return data
+
+
+def _summarize(query, remaining_ms, template=None):
+    """ Columns, count, bounds and zoom range for a layer, materializing it if it is expensive. """
+    sql, params = rows_builder.build_describe_query(*_source(query, None, template))
+    all_cols = describe_sql(sql, params, timeout_ms=remaining_ms())
+    if all_cols is None:
+        return None
+
+    geom_col = _detect_geom_col(all_cols)
+    columns = [c for c in all_cols if c != geom_col]
+
+    # Reuse a live materialization of the same SQL
+    table = materialize.existing(query) if geom_col else None
+    source, source_params = _source(query, table, template)
+
+    start = time.perf_counter()
+    sql, params = rows_builder.build_summary_query(source, geom_col is not None, source_params)
+    summary_rows = execute_sql(sql, params, timeout_ms=remaining_ms())
+    runtime = time.perf_counter() - start
+    if not summary_rows:
+        return None
+    summary = summary_rows[0]
+
+    # Expensive layers are computed once into a table instead of once per tile
+    if not table and geom_col and summary["feature_count"] and materialize.should_materialize(query, runtime):
+        table = materialize.materialize(query)
+
+    bounds = [summary["xmin"], summary["ymin"], summary["xmax"], summary["ymax"]] if summary.get("xmin") is not None else None
+    minzoom, maxzoom = mvt_builder.useful_zoom_range(bounds, TILE_MAX_ZOOM, bool(summary.get("polygonal")))
+
+    return {
+        "columns": columns,
+        "feature_count": summary["feature_count"],
+        "bounds": bounds,
+        "minzoom": minzoom,
+        "maxzoom": maxzoom,
+        "materialized_table": table,
+        "feature_ids": None,
+        "rows": [],
+        "next_cursor": None,
+    }
+
+
+def _reuse_summary(query, known):
+    """ Summary of an already stored identical layer, or None if it has none or its materialization is gone. """
+    if "feature_count" not in known or "columns" not in known:
+        return None
+
+    table = known.get("materialized_table")
+    if table and materialize.existing(query) != table:
+        return None
+
+    print(f"[Parse] Reusing stored summary for layer {known['name']}")
+    return {
+        **{k: known.get(k) for k in ("columns", "feature_count", "bounds", "minzoom", "maxzoom", "materialized_table")},
+        "feature_ids": known.get("feature_ids"),
+        "rows": [],
+        "next_cursor": None,
+    }
+
+
+def load_layers(queries, tiles=None, templates=None):
+    """
+    Yields (index, load_layer result) as each layer finishes, running up to
+    PLAN_PARALLELISM layers at once on the connection pool. Layers still running
+    when the PLAN_DEADLINE_SECONDS deadline passes are cancelled and never yielded.
+    tiles are the layers' tile_metadata; id sets are collected for filter_table layers.
+    templates are the queries' build_query_params pairs, run in place of the plain SQL.
+    """
+    if not queries:
+        return
+
+    tiles = tiles or [{}] * len(queries)
+    templates = templates or [None] * len(queries)
+    deadline = time.monotonic() + PLAN_DEADLINE_SECONDS
+    workers = max(1, min(PLAN_PARALLELISM, len(queries)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plan")
+    futures = {
+        executor.submit(_load_timed, query, i, deadline, bool(tiles[i].get("filter_table")), templates[i]): i
+        for i, query in enumerate(queries)
+    }
+
+    try:
+        for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+            yield futures[future], future.result()
+    except TimeoutError:
+        pending = sorted(i for f, i in futures.items() if not f.done())
+        logging.warning("[Parse] Plan deadline (%.1fs) reached, dropping layer(s) %s", PLAN_DEADLINE_SECONDS, pending)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _load_timed(query, index, deadline, collect_ids=False, template=None):
+    if deadline - time.monotonic() <= 0:
+        return None
+
+    print("[Parse] Loading: ", query)
+    start = time.perf_counter()
+    # An identical layer (same canonical SQL) may already be stored with its summary
+    known = layer_store.get_layer(sql_canon.layer_id(query, _layer_name(query, index)))
+    # statement_timeout makes Postgres abandon the queries at the plan deadline too
+    data = load_layer(query, deadline, collect_ids, known, template)
+    count = data["feature_count"] if data else 0
+    logging.info("[Parse] Layer %d: %d feature(s) in %.3f sec", index, count, time.perf_counter() - start)
+    return data
+
+
+def parse_results(queries, descriptions=None, templates=None):
+    """
+    Loads every layer and registers the non-empty ones, in plan order. descriptions come
+    from query_builder.describe_layers, templates from query_builder.build_query_params.
+    """
     layers = []
+    tiles = [tile_metadata(d) for d in descriptions] if descriptions else [{}] * len(queries)
 
-    for query in queries:
-        print("[Parse] Executing: ", query)
-        rows = execute_sql(query)
-        
-        if not rows:
+    # Layers are independent: run them concurrently, then assemble in plan order
+    results = [None] * len(queries)
+    for index, data in load_layers(queries, tiles, templates):
+        results[index] = data
+
+    for index, (query, data, tile) in enumerate(zip(queries, results, tiles)):
+        if not data or not data["feature_count"]:
             continue
         
-        colnames = list(rows[0].keys())
-        geom_col = _detect_geom_col(rows[0])
-        
-        # Exclude geometry from attribute columns
-        prop_cols = [c for c in colnames if c != geom_col]
-        
-        # Build table rows (attributes only, no geometry)
-        table_rows = []
-        for row in rows:
-            table_rows.append([row.get(c) for c in prop_cols])
-        
-        # Extract layer name from query
-        match = re.search(r"\bfrom\s+([a-zA-Z0-9_\"\.]+)", query, re.IGNORECASE)
-        if match:
-            layer_name = match.group(1).replace('"', '')
-        else:
-            layer_name = f"layer_{len(layers) + 1}"
-        
-        # Store the query for MVT tile generation
-        layer_id = layer_store.create_layer(query, layer_name)
-        
-        layers.append({
-            "name": layer_name,
-            "layer_id": layer_id,
-            "tile_url": f"/api/tiles/{layer_id}/{{z}}/{{x}}/{{y}}.pbf",
-            "columns": prop_cols,
-            "rows": table_rows
-        })
+        metadata = {**layer_metadata(data), **tile, "feature_ids": data["feature_ids"]}
+        # Plan index, so the layer name (and content-addressed ID) matches the one looked up in load_layers
+        layer = register_layer(query, index, metadata)
+        # The materialized table and id set stay server-side
+        layer.update(layer_summary(data), rows=data["rows"], next_cursor=data["next_cursor"])
+        layers.append(layer)
     
-    return layers
\ No newline at end of file
+    return layers
@@ -10,7 +10,32 @@ Based on specifications in:
 - docs/specs/json_plan.md
 """
 
-from typing import Dict, List, Any, Optional
+import hashlib
+import json
+import math
+import re
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Any, Optional, Tuple
+
+# ST_DWithin on ::geography can't use the GiST indexes on the 4326 geometry columns.
+# With the prefilter on, distance checks are emitted as an index-friendly planar
+# ST_DWithin in degrees AND the exact geography check. Degrees are derived from the
+# (shortest) longitude degree at DWITHIN_PREFILTER_LATITUDE so the prefilter is a
+# superset of the exact check for all data south of that latitude (Toronto ~43.9N).
+DWITHIN_PREFILTER = True
+DWITHIN_PREFILTER_LATITUDE = 45.0
+_METRES_PER_DEGREE = 111320.0
+
+# Stand-in for a bound value while building a template. Replaced with %s once the
+# SQL is complete, after any literal % in plan expressions has been escaped.
+_PARAM = "\x00"
+
+# Compiled plans (see compile_plan), keyed by structural hash. LRU.
+PLAN_TEMPLATE_CACHE_MAX = 512
+_compiled: "OrderedDict[str, CompiledPlan]" = OrderedDict()
+_lock = Lock()
+_stats = {"hits": 0, "misses": 0}
 
 
 def build_query(plan: Dict) -> List[str]:
@@ -28,38 +53,295 @@ def build_query(plan: Dict) -> List[str]:
         queries = build_query(plan)
         # Returns: ["SELECT ... FROM attractions;"]
     """
+    compiled, literals = compile_plan(plan)
+    return compiled.render(literals)
+
+
+def build_query_params(plan: Dict) -> List[Tuple[str, list]]:
+    """
+    Same queries as build_query, as (sql_template, params) pairs: every filter value,
+    distance and limit is a %s placeholder (literal % is escaped as %%). Plans that
+    differ only in values share a template, so the database can reuse one prepared
+    statement for them instead of parsing and planning each query from scratch.
+    
+    Example:
+        build_query_params(plan)
+        # Returns: [("SELECT ... FROM attractions WHERE (category ILIKE %s);", ["%museum%"])]
+    """
+    compiled, literals = compile_plan(plan)
+    return compiled.bind(literals)
+
+
+class _Slot:
+    """ A plan literal in a compiled template: literals[index], optionally derived (e.g. metres -> degrees). """
+    __slots__ = ("index", "derive")
+
+    def __init__(self, index: int, derive=None):
+        self.index = index
+        self.derive = derive
+
+    def resolve(self, literals: List[Any]) -> Any:
+        value = literals[self.index]
+        return self.derive(value) if self.derive else value
+
+
+class CompiledPlan:
+    """
+    A plan's SQL compiled once per structure (everything but its literal values).
+    
+    templates: one (sql_template, [_Slot, ...]) per layer, slots in placeholder order
+    slots: one (path, kind) per literal, e.g. ("layers.0.query.spatial_filters.0.distance", "distance")
+    descriptions: describe_layers of the plan (structural, the same for any literals)
+    """
+
+    def __init__(self, key: str, templates: List[Tuple[str, List[_Slot]]], slots: List[Tuple[str, str]],
+                 skeleton: Dict, descriptions: List[Dict[str, Any]]):
+        self.key = key
+        self.templates = templates
+        self.slots = slots
+        self.skeleton = skeleton
+        self.descriptions = descriptions
+
+    def bind(self, literals: List[Any]) -> List[Tuple[str, list]]:
+        """ (sql_template, params) per layer for the given literals (in slot order). No plan traversal. """
+        if len(literals) != len(self.slots):
+            raise ValueError(f"Expected {len(self.slots)} literal(s), got {len(literals)}")
+        return [(sql, [slot.resolve(literals) for slot in slots]) for sql, slots in self.templates]
+
+    def render(self, literals: List[Any]) -> List[str]:
+        """ Plain SQL per layer, literals inlined (the form layer IDs and cache keys are derived from). """
+        return [_render(sql, params) for sql, params in self.bind(literals)]
+
+    def plan(self, literals: List[Any]) -> Dict:
+        """ The JSON plan these literals describe (e.g. a patched plan, to store it). """
+        return _fill(self.skeleton, literals)
+
+    def patch(self, literals: List[Any], values: Dict[str, Any]) -> List[Any]:
+        """
+        Copy of literals with some replaced, keyed by slot path. Raises ValueError for a
+        path that isn't a slot of this plan or a value its slot can't take.
+        """
+        index = {path: i for i, (path, _) in enumerate(self.slots)}
+        unknown = sorted(set(values) - set(index))
+        if unknown:
+            raise ValueError(f"Not a parameter of this plan: {', '.join(unknown)}")
+        
+        patched = list(literals)
+        for path, value in values.items():
+            kind = self.slots[index[path]][1]
+            if value is None or isinstance(value, (list, dict)):
+                raise ValueError(f"{path}: expected a single {kind} value, got {value!r}")
+            try:
+                patched[index[path]] = _SLOT_CHECK[kind](value, literals[index[path]])
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{path}: invalid {kind} {value!r} ({e})")
+        return patched
+
+
+def compile_plan(plan: Dict) -> Tuple[CompiledPlan, List[Any]]:
+    """
+    Returns (compiled plan, this plan's literals). Plans that differ only in literal
+    values (filter values, distances, limits) share one CompiledPlan, so only the first
+    of them is walked and validated by the builders; the rest just bind new values.
+    
+    Example:
+        compiled, literals = compile_plan(plan)   # literals: [500, "%museum%"]
+        compiled.render([750, "%museum%"])        # Same SQL with a 750m distance
+    """
     if not plan or "layers" not in plan:
         raise ValueError("Invalid plan: missing 'layers' key")
     
-    sql_queries = []
-    
-    for layer in plan["layers"]:
+    # Skeleton: the plan with every literal replaced by a slot
+    skeleton = json.loads(json.dumps(plan))
+    literals, slots = [], []
+    for container, key, path, kind in _literal_slots(skeleton):
+        literals.append(container[key])
+        slots.append((path, kind))
+        container[key] = _Slot(len(literals) - 1, _SLOT_DERIVE[kind])
+    
+    structure = json.dumps(skeleton, sort_keys=True, default=lambda slot: "\x00")
+    # Build options change the SQL too (the benchmark toggles the prefilter)
+    key = hashlib.sha256(f"{DWITHIN_PREFILTER}\0{structure}".encode("utf-8")).hexdigest()
+    
+    with _lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            _stats["hits"] += 1
+            return compiled, literals
+    
+    templates = []
+    for layer in skeleton["layers"]:
         if "query" not in layer:
             raise ValueError(f"Layer missing 'query' field: {layer.get('layer_name', 'unknown')}")
         
-        query_obj = layer["query"]
-        query_type = query_obj.get("type", "select")
-        
-        # Route to appropriate query builder based on type
-        if query_type == "cte":
-            sql = _build_cte_query(query_obj)
-        elif query_type == "union":
-            sql = _build_union_query(query_obj)
-        elif query_type in ("select", "aggregate"):
-            sql = _build_select_query(query_obj)
-        else:
-            raise ValueError(f"Unknown query type: {query_type}")
+        params = []
+        sql = _build_layer_query(layer["query"], params)
+        templates.append((sql.replace("%", "%%").replace(_PARAM, "%s"), params))
+    
+    compiled = CompiledPlan(key, templates, slots, skeleton, describe_layers(skeleton))
+    with _lock:
+        _stats["misses"] += 1
+        _compiled[key] = compiled
+        while len(_compiled) > PLAN_TEMPLATE_CACHE_MAX:
+            _compiled.popitem(last=False)
+    
+    return compiled, literals
+
+
+def _fill(node, literals: List[Any]):
+    """ Copy of a skeleton with every slot replaced by its literal. """
+    if isinstance(node, _Slot):
+        return literals[node.index]
+    if isinstance(node, dict):
+        return {key: _fill(value, literals) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_fill(value, literals) for value in node]
+    return node
+
+
+def template_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {"size": len(_compiled), **_stats}
+
+
+def _literal_slots(plan: Dict):
+    """ (container, key, path, kind) for every bindable literal in a plan, in a fixed order. """
+    for i, layer in enumerate(plan["layers"]):
+        yield from _query_slots(layer.get("query") or {}, f"layers.{i}.query")
+
+
+def _query_slots(query: Dict, path: str):
+    query_type = query.get("type", "select")
+    if query_type == "cte":
+        for n, cte in enumerate(query.get("ctes") or []):
+            yield from _query_slots(cte.get("query") or {}, f"{path}.ctes.{n}.query")
+        yield from _query_slots(query.get("main_query") or {}, f"{path}.main_query")
+        return
+    if query_type == "union":
+        for n, sub_query in enumerate(query.get("queries") or []):
+            yield from _query_slots(sub_query, f"{path}.queries.{n}")
+        return
+    
+    yield from _filter_slots(query.get("filters"), f"{path}.filters")
+    
+    for k, sf in enumerate(query.get("spatial_filters") or []):
+        sf_path = f"{path}.spatial_filters.{k}"
+        if sf.get("distance") is not None:
+            yield sf, "distance", f"{sf_path}.distance", "distance"
+        # Same precedence as _build_spatial_filters
+        if "target_filters" in sf:
+            yield from _filter_slots(sf["target_filters"], f"{sf_path}.target_filters")
+        elif "target_filter" in sf:
+            yield from _filter_slots([sf["target_filter"]], f"{sf_path}.target_filter", single=True)
+    
+    for k, join in enumerate(query.get("joins") or []):
+        condition = join.get("condition") or {}
+        if condition.get("distance") is not None:
+            yield condition, "distance", f"{path}.joins.{k}.condition.distance", "distance"
+    
+    # A zero/missing limit is structural: it means no LIMIT clause
+    if query.get("limit"):
+        yield query, "limit", f"{path}.limit", "limit"
+
+
+def _filter_slots(filters: Optional[List[Dict]], path: str, single: bool = False):
+    for j, filter_obj in enumerate(filters or []):
+        filter_path = path if single else f"{path}.{j}"
+        if str(filter_obj.get("operator", "")).upper() in ("IS NULL", "IS NOT NULL"):
+            continue
         
-        sql_queries.append(sql)
+        # NULL renders as a keyword, not a parameter, so it stays structural
+        value = filter_obj.get("value")
+        if isinstance(value, list):
+            for m, item in enumerate(value):
+                if item is not None:
+                    yield value, m, f"{filter_path}.value.{m}", "value"
+        elif value is not None:
+            yield filter_obj, "value", f"{filter_path}.value", "value"
+
+
+def _render(sql_template: str, params: list) -> str:
+    """ Inline bound values into a template (the inverse of build_query_params). """
+    values = iter(params)
+    return re.sub(r"%%|%s", lambda m: "%" if m.group() == "%%" else _format_value(next(values)), sql_template)
+
+
+def _build_layer_query(query_obj: Dict, params: Optional[list] = None) -> str:
+    """ Route a layer's query object to the builder for its type. """
+    query_type = query_obj.get("type", "select")
+    
+    if query_type == "cte":
+        return _build_cte_query(query_obj, params)
+    elif query_type == "union":
+        return _build_union_query(query_obj, params)
+    elif query_type in ("select", "aggregate"):
+        return _build_select_query(query_obj, params)
+    else:
+        raise ValueError(f"Unknown query type: {query_type}")
+
+
+def describe_layers(plan: Dict) -> List[Dict[str, Any]]:
+    """
+    Describe where each layer's features come from, in the same order as build_query.
+    
+    Returns one dict per layer:
+        geometry_table: base table whose rows are the layer's features (the layer's
+            id and geometry are that table's unmodified id and geometry columns), or
+            None when features are computed (aggregates, CTEs, unions, expressions,
+            geometry or id taken from a joined table)
+        unfiltered: True when the layer is every row of geometry_table (no filters,
+            spatial filters, joins or limit), so its tiles don't depend on the plan
     
-    return sql_queries
+    Example:
+        describe_layers({"layers": [{"query": {"table": "parks", "columns": [{"name": "geometry"}]}}]})
+        # Returns: [{"geometry_table": "parks", "unfiltered": True}]
+    """
+    if not plan or "layers" not in plan:
+        raise ValueError("Invalid plan: missing 'layers' key")
+    
+    descriptions = []
+    for layer in plan["layers"]:
+        query = layer.get("query", {})
+        geometry_table = _geometry_table(query)
+        unfiltered = geometry_table is not None and not any(
+            query.get(key) for key in ("filters", "spatial_filters", "joins", "limit")
+        )
+        descriptions.append({"geometry_table": geometry_table, "unfiltered": unfiltered})
+    
+    return descriptions
+
 
+def _geometry_table(query: Dict) -> Optional[str]:
+    """ Base table when the query's id and geometry pass straight through from it. """
+    if query.get("type", "select") != "select" or query.get("group_by") or not query.get("table"):
+        return None
+    
+    base_refs = {"", query["table"], query.get("alias", query["table"])}
+    
+    def from_base(name: str, column: str) -> bool:
+        prefix, _, col = name.rpartition(".")
+        return col == column and prefix in base_refs
+    
+    has_geometry = False
+    for col in query.get("columns", []):
+        output = col.get("alias", col.get("name", ""))
+        if output not in ("id", "geometry"):
+            continue
+        if "expression" in col or "aggregate" in col or not from_base(col.get("name", ""), output):
+            return None
+        has_geometry = has_geometry or output == "geometry"
+    
+    return query["table"] if has_geometry else None
 
-def _build_select_query(query: Dict) -> str:
+
+def _build_select_query(query: Dict, params: Optional[list] = None) -> str:
     """
     Build a SELECT or AGGREGATE query from query object.
     
     Handles: SELECT, FROM, JOIN, WHERE, spatial filters, GROUP BY, ORDER BY, LIMIT
+    
+    With params, values are appended to it (in SQL text order) instead of inlined.
     """
     parts = []
     
@@ -74,19 +356,19 @@ def _build_select_query(query: Dict) -> str:
     
     # JOIN clauses
     if "joins" in query and query["joins"]:
-        join_clauses = _build_joins(query)
+        join_clauses = _build_joins(query, params)
         parts.extend(join_clauses)
     
     # WHERE clause (regular filters + spatial filters)
     where_conditions = []
     
     if "filters" in query and query["filters"]:
-        filter_clause = _build_where_clause(query["filters"])
+        filter_clause = _build_where_clause(query["filters"], params)
         if filter_clause:
             where_conditions.append(f"({filter_clause})")
     
     if "spatial_filters" in query and query["spatial_filters"]:
-        spatial_clauses = _build_spatial_filters(query)
+        spatial_clauses = _build_spatial_filters(query, params)
         where_conditions.extend(spatial_clauses)
     
     if where_conditions:
@@ -104,7 +386,8 @@ def _build_select_query(query: Dict) -> str:
     
     # LIMIT clause
     if "limit" in query and query["limit"]:
-        parts.append(f"LIMIT {int(query['limit'])}")
+        limit = query["limit"]
+        parts.append(f"LIMIT {_format_value(limit if isinstance(limit, _Slot) else int(limit), params)}")
     
     return " ".join(parts) + ";"
 
@@ -219,7 +502,7 @@ def _build_from_clause(query: Dict) -> str:
     return table
 
 
-def _build_where_clause(filters: List[Dict]) -> str:
+def _build_where_clause(filters: List[Dict], params: Optional[list] = None) -> str:
     """
     Build WHERE clause from filter objects.
     
@@ -248,26 +531,26 @@ def _build_where_clause(filters: List[Dict]) -> str:
         elif operator == "BETWEEN":
             if not isinstance(value, list) or len(value) != 2:
                 raise ValueError(f"BETWEEN requires array of 2 values: {value}")
-            val1 = _format_value(value[0])
-            val2 = _format_value(value[1])
+            val1 = _format_value(value[0], params)
+            val2 = _format_value(value[1], params)
             condition = f"{column} BETWEEN {val1} AND {val2}"
         
         elif operator == "NOT BETWEEN":
             if not isinstance(value, list) or len(value) != 2:
                 raise ValueError(f"NOT BETWEEN requires array of 2 values: {value}")
-            val1 = _format_value(value[0])
-            val2 = _format_value(value[1])
+            val1 = _format_value(value[0], params)
+            val2 = _format_value(value[1], params)
             condition = f"{column} NOT BETWEEN {val1} AND {val2}"
         
         elif operator in ("IN", "NOT IN"):
             if not isinstance(value, list):
                 raise ValueError(f"{operator} requires array value: {value}")
-            formatted_values = ", ".join(_format_value(v) for v in value)
+            formatted_values = ", ".join(_format_value(v, params) for v in value)
             condition = f"{column} {operator} ({formatted_values})"
         
         else:
             # Standard comparison operators
-            formatted_value = _format_value(value)
+            formatted_value = _format_value(value, params)
             condition = f"{column} {operator} {formatted_value}"
         
         # Add logical operator if not first condition
@@ -280,7 +563,7 @@ def _build_where_clause(filters: List[Dict]) -> str:
     return " ".join(conditions)
 
 
-def _build_spatial_filters(query: Dict) -> List[str]:
+def _build_spatial_filters(query: Dict, params: Optional[list] = None) -> List[str]:
     """
     Build spatial filter clauses using EXISTS subqueries.
     
@@ -327,10 +610,7 @@ def _build_spatial_filters(query: Dict) -> List[str]:
             distance = sf.get("distance")
             if distance is None:
                 raise ValueError("ST_DWithin requires 'distance' parameter")
-            spatial_condition = (
-                f"ST_DWithin({table_alias}.geometry::geography, "
-                f"{target_table}.geometry::geography, {distance})"
-            )
+            spatial_condition = _build_dwithin(f"{table_alias}.geometry", f"{target_table}.geometry", distance, params)
         elif operation in ("ST_Intersects", "ST_Contains", "ST_Within"):
             spatial_condition = f"{operation}({table_alias}.geometry, {target_table}.geometry)"
         else:
@@ -349,7 +629,7 @@ def _build_spatial_filters(query: Dict) -> List[str]:
         
         if target_filters_list:
             # Build WHERE clause for target filters
-            target_where = _build_where_clause(target_filters_list)
+            target_where = _build_where_clause(target_filters_list, params)
             if target_where:
                 target_filter_clause = f" AND {target_where}"
         
@@ -364,7 +644,7 @@ def _build_spatial_filters(query: Dict) -> List[str]:
     return clauses
 
 
-def _build_joins(query: Dict) -> List[str]:
+def _build_joins(query: Dict, params: Optional[list] = None) -> List[str]:
     """
     Build JOIN clauses from join objects.
     
@@ -403,10 +683,7 @@ def _build_joins(query: Dict) -> List[str]:
                 distance = condition.get("distance")
                 if distance is None:
                     raise ValueError("ST_DWithin join requires 'distance'")
-                join_condition = (
-                    f"ST_DWithin({base_table_alias}.geometry::geography, "
-                    f"{join_alias}.geometry::geography, {distance})"
-                )
+                join_condition = _build_dwithin(f"{base_table_alias}.geometry", f"{join_alias}.geometry", distance, params)
             elif operation in ("ST_Intersects", "ST_Contains", "ST_Within"):
                 join_condition = (
                     f"{operation}({base_table_alias}.geometry, {join_alias}.geometry)"
@@ -440,6 +717,83 @@ def _build_joins(query: Dict) -> List[str]:
     return join_clauses
 
 
+def _build_dwithin(left_geom: str, right_geom: str, distance, params: Optional[list] = None) -> str:
+    """
+    Build a distance-in-metres condition between two 4326 geometry columns.
+    
+    Example (prefilter on, 500m):
+        (ST_DWithin(a.geometry, b.geometry, 0.00635205) AND
+         ST_DWithin(a.geometry::geography, b.geometry::geography, 500))
+    """
+    if isinstance(distance, _Slot):
+        # Compiled template: both values are derived from the literal when it is bound
+        metres, degrees = distance, _Slot(distance.index, _prefilter_degrees)
+    else:
+        metres = _as_metres(distance)
+        degrees = _prefilter_degrees(metres)
+    
+    # Built first: params follow SQL text order
+    prefilter = f"ST_DWithin({left_geom}, {right_geom}, {_format_value(degrees, params)})" if DWITHIN_PREFILTER else None
+    exact = f"ST_DWithin({left_geom}::geography, {right_geom}::geography, {_format_value(metres, params)})"
+    
+    return f"({prefilter} AND {exact})" if prefilter else exact
+
+
+def _as_metres(distance) -> float:
+    if isinstance(distance, (int, float)) and not isinstance(distance, bool):
+        return distance
+    try:
+        return float(distance)
+    except (TypeError, ValueError):
+        raise ValueError(f"ST_DWithin 'distance' must be a number of metres: {distance}")
+
+
+def _prefilter_degrees(distance) -> float:
+    return round(_as_metres(distance) / (_METRES_PER_DEGREE * math.cos(math.radians(DWITHIN_PREFILTER_LATITUDE))), 8)
+
+
+# Bind-time conversion (and validation) of each kind of literal
+_SLOT_DERIVE = {"value": None, "distance": _as_metres, "limit": int}
+
+
+def _check_value(value, original):
+    # A filter value keeps the type of the literal it replaces: ints and floats interchange,
+    # but a number never becomes a bool or a string (or the reverse)
+    if isinstance(original, bool):
+        if not isinstance(value, bool):
+            raise TypeError("must be a bool")
+    elif isinstance(original, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError("must be a number")
+    elif not isinstance(value, type(original)):
+        raise TypeError(f"must be a {type(original).__name__}")
+    return value
+
+
+def _check_distance(value, original):
+    if isinstance(value, bool):
+        raise TypeError("must be a number of metres")
+    metres = _as_metres(value)
+    if not math.isfinite(metres) or metres < 0:
+        raise ValueError("must be a non-negative number of metres")
+    return metres
+
+
+def _check_limit(value, original):
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise TypeError("must be a positive integer")
+    limit = int(value)
+    if limit <= 0:
+        # A zero/missing limit is structural (no LIMIT clause), so it can't be bound into a slot
+        raise ValueError("must be a positive integer")
+    return limit
+
+
+# Validation (and normalization) of patched literals, by kind: the returned value is what
+# is bound, rendered and stored, so the SQL that runs and the saved plan always agree
+_SLOT_CHECK = {"value": _check_value, "distance": _check_distance, "limit": _check_limit}
+
+
 def _build_group_by(group_by: List[str], added_id_col: Optional[str] = None) -> str:
     """
     Build GROUP BY clause from list of column names.
@@ -485,7 +839,7 @@ def _build_order_by(order_by: List[Dict]) -> str:
     return ", ".join(order_parts)
 
 
-def _build_union_query(query: Dict) -> str:
+def _build_union_query(query: Dict, params: Optional[list] = None) -> str:
     """
     Build UNION query from multiple sub-queries.
     
@@ -506,7 +860,7 @@ def _build_union_query(query: Dict) -> str:
     # Build each sub-query (remove trailing semicolon)
     sub_queries = []
     for sub_query in query["queries"]:
-        sql = _build_select_query(sub_query)
+        sql = _build_select_query(sub_query, params)
         # Remove semicolon if present
         sql = sql.rstrip(";")
         sub_queries.append(sql)
@@ -516,7 +870,7 @@ def _build_union_query(query: Dict) -> str:
     return f" {union_operator} ".join(sub_queries) + ";"
 
 
-def _build_cte_query(query: Dict) -> str:
+def _build_cte_query(query: Dict, params: Optional[list] = None) -> str:
     """
     Build CTE (Common Table Expression) query.
     
@@ -545,18 +899,18 @@ def _build_cte_query(query: Dict) -> str:
         cte_query = cte["query"]
         
         # Build the CTE query (remove trailing semicolon)
-        cte_sql = _build_select_query(cte_query).rstrip(";")
+        cte_sql = _build_select_query(cte_query, params).rstrip(";")
         cte_parts.append(f"{cte_name} AS ({cte_sql})")
     
     # Build main query (remove trailing semicolon)
-    main_sql = _build_select_query(query["main_query"]).rstrip(";")
+    main_sql = _build_select_query(query["main_query"], params).rstrip(";")
     
     # Combine: WITH cte1 AS (...), cte2 AS (...) main_query
     ctes_clause = ", ".join(cte_parts)
     return f"WITH {ctes_clause} {main_sql};"
 
 
-def _format_value(value: Any) -> str:
+def _format_value(value: Any, params: Optional[list] = None) -> str:
     """
     Format a value for SQL insertion.
     
@@ -565,10 +919,21 @@ def _format_value(value: Any) -> str:
     - Strings -> 'escaped string'
     - Numbers -> number
     - Booleans -> TRUE/FALSE
+    
+    With params, non-NULL values (and compiled-plan slots) are appended to params and
+    a placeholder is returned.
     """
     if value is None:
         return "NULL"
     
+    if isinstance(value, _Slot):
+        params.append(value)
+        return _PARAM
+    
+    if params is not None:
+        params.append(value if isinstance(value, (bool, int, float, str)) else str(value))
+        return _PARAM
+    
     if isinstance(value, bool):
         return "TRUE" if value else "FALSE"
     
@@ -0,0 +1,94 @@
+"""
+Rows Builder Module
+
+Builds the attribute-table queries for a stored layer: a column describe, a
+cheap count/extent summary, and keyset-paginated pages that project out the
+geometry column. Pages are ordered and keyed on the `id` column that
+query_builder guarantees for every layer.
+
+Every builder returns (sql, params). The base query is either plain SQL
+(base_params=None, any literal % is escaped here) or a query_builder template
+with its params, which are bound ahead of the builder's own.
+"""
+
+from typing import List, Optional, Tuple
+
+
+def _base(base_query: str, base_params: Optional[list]) -> Tuple[str, list]:
+    sql = base_query.strip().rstrip(";")
+    if base_params is None:
+        # Literal % in plain layer SQL (e.g. ILIKE '%park%') must be escaped once placeholders are used
+        return sql.replace("%", "%%"), []
+    return sql, list(base_params)
+
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+
+def build_describe_query(base_query: str, base_params: Optional[list] = None) -> Tuple[str, list]:
+    """ Zero-row query used to read the layer's column names. """
+    base, params = _base(base_query, base_params)
+    return f"SELECT * FROM ({base}) AS base_data LIMIT 0;", params
+
+
+def build_summary_query(base_query: str, has_geometry: bool = True, base_params: Optional[list] = None) -> Tuple[str, list]:
+    """ Feature count, bounding box (EPSG:4326) and whether every feature is a polygon, without transferring any rows. """
+    base, params = _base(base_query, base_params)
+    if not has_geometry:
+        return f"SELECT count(*) AS feature_count FROM ({base}) AS base_data;", params
+
+    sql = f"""
+    SELECT feature_count, polygonal,
+        ST_XMin(extent) AS xmin, ST_YMin(extent) AS ymin,
+        ST_XMax(extent) AS xmax, ST_YMax(extent) AS ymax
+    FROM (
+        SELECT count(*) AS feature_count, ST_Extent(base_data.geometry) AS extent,
+            coalesce(bool_and(ST_Dimension(base_data.geometry) = 2), false) AS polygonal
+        FROM ({base}) AS base_data
+    ) AS summary;
+    """
+    return sql, params
+
+
+def build_id_set_query(base_query: str, base_params: Optional[list] = None) -> Tuple[str, list]:
+    """ Every id in the layer, used to filter pre-rendered tiles down to the layer's features. """
+    base, params = _base(base_query, base_params)
+    return f"SELECT DISTINCT base_data.id FROM ({base}) AS base_data;", params
+
+
+def build_page_query(base_query: str, columns: List[str], after=None, limit: int = 100, keyed: bool = True, base_params: Optional[list] = None) -> Tuple[str, list]:
+    """ One page of attribute rows with id > after, ordered by id. Unkeyed layers (no id) get a plain LIMIT. """
+    select = ", ".join(_quote(c) for c in columns)
+    base, params = _base(base_query, base_params)
+    if not keyed:
+        return f"SELECT {select} FROM ({base}) AS base_data LIMIT %s;", params + [limit]
+
+    where = "WHERE base_data.id > %s " if after is not None else ""
+    params += ([after] if after is not None else []) + [limit]
+
+    sql = f"SELECT {select} FROM ({base}) AS base_data {where}ORDER BY base_data.id LIMIT %s;"
+    return sql, params
+
+
+def build_id_rows_query(base_query: str, columns: List[str], row_id, base_params: Optional[list] = None) -> Tuple[str, list]:
+    """ Every row sharing one id, used to complete a page that ends mid-id (joins can repeat ids). """
+    select = ", ".join(_quote(c) for c in columns)
+    base, params = _base(base_query, base_params)
+    sql = f"SELECT {select} FROM ({base}) AS base_data WHERE base_data.id = %s;"
+    return sql, params + [row_id]
+
+
+def finish_page(rows, tail_rows, columns: List[str], limit: int):
+    """
+    Returns (table rows, next cursor). When a full page ends on an id, the rows for that
+    id are replaced with tail_rows (all rows for the id) so keyset paging never splits an id.
+    """
+    rows = rows or []
+    next_cursor: Optional[object] = None
+
+    if len(rows) >= limit and rows:
+        next_cursor = rows[-1]["id"]
+        rows = [r for r in rows if r["id"] != next_cursor] + list(tail_rows or [])
+
+    return [[r.get(c) for c in columns] for r in rows], next_cursor
@@ -0,0 +1,39 @@
+"""
+SQL Canonicalization Module
+
+Canonical form of generated layer SQL, used wherever "the same layer" must map to the
+same key: layer IDs, tile cache keys and materialized table names. Outside quoted
+literals and identifiers, whitespace is collapsed, spacing around punctuation is
+dropped and case is folded (unquoted SQL keywords and identifiers are case-insensitive).
+Quoted text is kept verbatim.
+"""
+
+import hashlib
+import re
+import uuid
+
+# Quoted literals/identifiers are kept verbatim, everything else is normalized
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_PUNCT_SPACE = re.compile(r"\s*([(),;])\s*")
+
+# Namespace for UUID-shaped layer IDs (clients treat layer IDs as UUIDs)
+LAYER_NAMESPACE = uuid.UUID("6f1c3a52-2f0e-4d7b-9a55-3c1e8d0b7f21")
+
+
+def canonicalize(sql: str) -> str:
+    parts = _QUOTED.split(sql.strip().rstrip(";").strip())
+    for i in range(0, len(parts), 2):
+        text = re.sub(r"\s+", " ", parts[i])
+        parts[i] = _PUNCT_SPACE.sub(r"\1", text).lower()
+    return "".join(parts).strip()
+
+
+def sql_hash(sql: str, *extra: str) -> str:
+    """ sha256 hex of the canonical SQL (plus any extra key parts). """
+    to_hash = "\0".join([canonicalize(sql), *extra])
+    return hashlib.sha256(to_hash.encode("utf-8")).hexdigest()
+
+
+def layer_id(sql: str, layer_name: str) -> str:
+    """ Deterministic, UUID-shaped ID: identical layers get the same ID in every process and session. """
+    return str(uuid.uuid5(LAYER_NAMESPACE, f"{canonicalize(sql)}\0{layer_name}"))
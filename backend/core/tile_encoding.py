@@ -0,0 +1,85 @@
+"""
+Tile Encoding Module
+
+Compresses MVT payloads once, before they are cached, so cached tiles are served
+as-is with a Content-Encoding header. gzip is always available; brotli is used
+when TILE_ENCODING=br and the optional `brotli` package is installed.
+"""
+
+import gzip
+import hashlib
+from typing import Optional
+
+from config.settings import TILE_ENCODING
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Encoding of every cached dynamic tile
+ENCODING = "br" if TILE_ENCODING == "br" and brotli is not None else "gzip"
+
+
+def encode(data: bytes) -> bytes:
+    """ Compress a raw MVT in ENCODING. Empty tiles stay b"". """
+    if not data:
+        return b""
+    if ENCODING == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decode(data: bytes, encoding: Optional[str] = ENCODING) -> bytes:
+    """ Raw MVT bytes from an encoded tile. """
+    if not data or encoding is None:
+        return data
+    if encoding == "br":
+        return brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+def sniff(data: bytes) -> Optional[str]:
+    """ "gzip" for gzip-compressed bytes (e.g. MBTiles tiles), None for a raw MVT. """
+    return "gzip" if data[:2] == GZIP_MAGIC else None
+
+
+def accepts(accept_encoding: str, encoding: Optional[str]) -> bool:
+    """ Whether an Accept-Encoding header allows serving the encoding as-is. """
+    if encoding is None:
+        return True
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip() in (encoding, "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+def etag(*parts) -> str:
+    """ Strong validator for a tile, from the parts that determine its bytes. """
+    digest = hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def variant_etag(tag: str, accept_encoding: str, encoding: Optional[str]) -> str:
+    """
+    ETag of the bytes a client is sent: the tile's own tag when it is served as stored,
+    a separate strong validator when it is decoded for a client that doesn't accept the encoding.
+    """
+    if accepts(accept_encoding, encoding):
+        return tag
+    return tag[:-1] + '-identity"'
+
+
+def matches(if_none_match: Optional[str], tag: str) -> bool:
+    """ Whether an If-None-Match header matches the ETag (weak comparison, per RFC 9110). """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+    return tag in candidates
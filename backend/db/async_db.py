@@ -0,0 +1,50 @@
+from contextlib import asynccontextmanager
+
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from config.settings import DB_CONFIG, DEBUG_MODE, ASYNC_DB_POOL_MIN, ASYNC_DB_POOL_MAX, DB_PREPARE_THRESHOLD, DB_PREPARED_MAX
+
+async def _configure(conn):
+    # Same prepared statement reuse as the sync pool (see db.db)
+    conn.prepared_max = DB_PREPARED_MAX
+
+# Async connection pool, opened/closed by the FastAPI lifespan in main.py
+pool = AsyncConnectionPool(
+    make_conninfo(**{k: v for k, v in DB_CONFIG.items() if v}),
+    min_size=ASYNC_DB_POOL_MIN,
+    max_size=ASYNC_DB_POOL_MAX,
+    kwargs={
+        "autocommit": True,
+        "row_factory": dict_row,
+        "prepare_threshold": DB_PREPARE_THRESHOLD,
+        "options": "-c search_path=data,public",
+    },
+    configure=_configure,
+    open=False,
+)
+
+async def open_pool():
+    await pool.open()
+    print(f"[AsyncDB] Pool opened ({ASYNC_DB_POOL_MIN}-{ASYNC_DB_POOL_MAX} connections)")
+
+async def close_pool():
+    await pool.close()
+
+@asynccontextmanager
+async def get_conn():
+    async with pool.connection() as conn:
+        yield conn # Returned to pool on exit
+
+async def execute_sql(sql: str, params=None):
+    print(f"[AsyncDB] Attempting query: {sql}")
+    async with get_conn() as conn:
+        try:
+            cur = await conn.execute(sql, params)
+            return await cur.fetchall()
+
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"(DEUBG)[AsyncDB] SQL execution failed: {e}")
+            return None
@@ -1,37 +1,75 @@
-import psycopg2
-import psycopg2.extras
-import psycopg2.pool
 from contextlib import contextmanager
 
-from config.settings import DB_CONFIG, DEBUG_MODE
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 
-# Connection pool
-pool = psycopg2.pool.ThreadedConnectionPool(
-        minconn = 1,
-        maxconn = 10,
-        **DB_CONFIG
+from config.settings import DB_CONFIG, DEBUG_MODE, DB_POOL_MIN, DB_POOL_MAX, DB_PREPARE_THRESHOLD, DB_PREPARED_MAX
+
+def _configure(conn):
+    # Per-connection LRU of prepared statements, keyed by query text (and parameter types)
+    conn.prepared_max = DB_PREPARED_MAX
+
+# Connection pool. Statements run with server-side parameter binding; a query text seen
+# DB_PREPARE_THRESHOLD times on a connection is prepared there, so same-shaped queries
+# (query_builder.build_query_params templates, rows pages, embedding searches) skip
+# parse/plan on later executions.
+pool = ConnectionPool(
+    make_conninfo(**{k: v for k, v in DB_CONFIG.items() if v}),
+    min_size=DB_POOL_MIN,
+    max_size=DB_POOL_MAX,
+    kwargs={
+        "row_factory": dict_row,
+        "prepare_threshold": DB_PREPARE_THRESHOLD,
+        "options": "-c search_path=data,public",
+    },
+    configure=_configure,
+    open=True,
 )
 
 @contextmanager
 def get_conn():
-    conn = pool.getconn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("SET search_path to data, public")
-        yield conn
-    finally:
-        pool.putconn(conn) # Always return connection to pool
-
-def execute_sql(sql: str):
+    with pool.connection() as conn:
+        yield conn # Returned to pool on exit
+
+def _set_timeout(conn, timeout_ms: int=None):
+    if timeout_ms is None:
+        return
+    if timeout_ms <= 0:
+        # Deadline already passed: fail like a timed-out statement instead of running unbounded
+        raise TimeoutError("Deadline passed before the statement started")
+    # Scoped to this statement's transaction (SET can't take bound parameters)
+    conn.execute("SELECT set_config('statement_timeout', %s, true)", (str(int(timeout_ms)),))
+
+def execute_sql(sql: str, params=None, timeout_ms: int=None):
     print(f"[DB] Attempting query: {sql}")
     with get_conn() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            try:
-                cur.execute(sql)
-                return cur.fetchall()
-
-            except Exception as e:
-                if DEBUG_MODE:
-                    print(f"(DEUBG)[DB] SQL execution failed: {e}")
-                conn.rollback()
-                return None
+        try:
+            _set_timeout(conn, timeout_ms)
+            cur = conn.execute(sql, params)
+            # Statements without a result set (INSERT, DDL) return an empty list
+            rows = cur.fetchall() if cur.description else []
+            conn.commit()
+            return rows
+
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"(DEUBG)[DB] SQL execution failed: {e}")
+            conn.rollback()
+            return None
+
+def describe_sql(sql: str, params=None, timeout_ms: int=None):
+    """ Returns the column names produced by a query, or None if it fails. """
+    with get_conn() as conn:
+        try:
+            _set_timeout(conn, timeout_ms)
+            cur = conn.execute(sql, params)
+            columns = [d.name for d in cur.description]
+            conn.commit()
+            return columns
+
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"(DEUBG)[DB] Describe failed: {e}")
+            conn.rollback()
+            return None
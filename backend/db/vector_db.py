@@ -1,9 +1,13 @@
 from collections import defaultdict
 
 from db.db import execute_sql
+from db import vector_index
 
 def select_relevant_examples(embedding, score_threshold: float=-0.3):
-    matches = query_example_embeddings(embedding)
+    # In-memory index first, SQL scan as fallback
+    matches = vector_index.search_examples(embedding)
+    if matches is None:
+        matches = query_example_embeddings(embedding)
 
     filtered = [m for m in matches if m["score"] <=score_threshold]
     print(f"[VectorDB] Examples past threshold ({score_threshold}): {len(filtered)}")
@@ -12,17 +16,21 @@ def select_relevant_examples(embedding, score_threshold: float=-0.3):
 
     return relevant_examples
 
+def _vector_param(embedding) -> str:
+    # pgvector text format, bound as a parameter so the statement text stays constant
+    return "[" + ",".join(map(str, embedding)) + "]"
+
 def query_example_embeddings(embedding, limit: int=999):
     
-    sql = f"""
+    sql = """
         SELECT id, user_query, plan, 
-            embedding <#> '{embedding}' AS score
+            embedding <#> %s::vector AS score
         FROM meta.example_embeddings
         ORDER BY score
-        LIMIT {limit};
+        LIMIT %s;
     """
 
-    rows = execute_sql(sql)
+    rows = execute_sql(sql, (_vector_param(embedding), limit))
 
     return [
         {
@@ -35,43 +43,43 @@ def query_example_embeddings(embedding, limit: int=999):
     ]
         
 def select_relevant_tables(embedding, score_threshold: float=-0.3):
-    matches = query_table_embeddings(embedding, limit=100)
+    # In-memory index first, SQL scan as fallback
+    matches = vector_index.search_tables(embedding, limit=100)
+    if matches is None:
+        matches = query_table_embeddings(embedding, limit=100)
 
     # Filter on embed distance
     filtered = [m for m in matches if m["score"] <= score_threshold]
 
-    # Group cols by table
+    # Group cols by table, tracking each table's best column score
     tables = defaultdict(list)
+    best_score = {}
     for m in filtered:
         tables[m["table_name"]].append({
             "column_name": m["column_name"],
             "col_type": m["col_type"],
             "description": m["description"]
         })
+        best_score[m["table_name"]] = min(best_score.get(m["table_name"], 0), m["score"])
 
     # Build list of tables sorted by relevance
     relevant_tables = sorted(
         [{"table_name": t, "columns": cols} for t, cols in tables.items()],
-        key=lambda t: min(
-            next((c for c in filtered if c["column_name"] == col["column_name"]), {"score": 0})["score"]
-            for col in t["columns"]
-        )
+        key=lambda t: best_score[t["table_name"]]
     )
 
     return relevant_tables
 
 def query_table_embeddings(embedding, limit: int=999):
-    embedding_str = "[" + ",".join(map(str, embedding)) + "]"
-    
-    sql = f"""
+    sql = """
     SELECT table_name, column_name, col_type, description, 
-        embedding <#> '{embedding_str}' AS distance
+        embedding <#> %s::vector AS distance
     FROM meta.schema_embeddings
     ORDER BY distance ASC
-    LIMIT {limit};
+    LIMIT %s;
     """
 
-    rows = execute_sql(sql)
+    rows = execute_sql(sql, (_vector_param(embedding), limit))
 
     return [
         {
@@ -83,4 +91,3 @@ def query_table_embeddings(embedding, limit: int=999):
         }
         for r in rows
     ]
-
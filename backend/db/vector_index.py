@@ -0,0 +1,127 @@
+import json
+import time
+from threading import Lock
+from typing import Optional, List
+
+import numpy as np
+
+from config.settings import VECTOR_INDEX_ENABLED, VECTOR_INDEX_CHECK_SECONDS
+from db.db import execute_sql
+
+# Module-level state: one corpus per embeddings table
+# {"rows": [dict, ...], "matrix": np.ndarray (n x dim)}
+_corpora = {"schemas": None, "examples": None}
+_lock = Lock()
+_fingerprint: Optional[str] = None
+_checked = 0.0  # Last fingerprint check or load attempt
+
+RETRY_SECONDS = 10  # Between load attempts while loading fails (e.g. database down)
+
+
+def refresh() -> bool:
+    """ (Re)load schema and example embeddings into memory. Returns False if loading failed. """
+    global _fingerprint
+    fingerprint = corpus_fingerprint()
+
+    schema_rows = execute_sql("""
+        SELECT table_name, column_name, col_type, description, embedding::text AS embedding
+        FROM meta.schema_embeddings
+        WHERE embedding IS NOT NULL;
+    """)
+    example_rows = execute_sql("""
+        SELECT id, user_query, plan, embedding::text AS embedding
+        FROM meta.example_embeddings
+        WHERE embedding IS NOT NULL;
+    """)
+    if schema_rows is None or example_rows is None:
+        print("[VectorIndex] Load failed, falling back to SQL search")
+        return False
+
+    schemas = _build_corpus(schema_rows)
+    examples = _build_corpus(example_rows)
+
+    with _lock:
+        _corpora["schemas"] = schemas
+        _corpora["examples"] = examples
+        _fingerprint = fingerprint
+
+    print(f"[VectorIndex] Loaded {len(schema_rows)} schema and {len(example_rows)} example embeddings")
+    return True
+
+
+def corpus_fingerprint():
+    """ Hash of the schema and example corpora, changes whenever either is re-populated. """
+    sql = """
+        SELECT
+            (SELECT md5(coalesce(string_agg(
+                table_name || '.' || coalesce(column_name, '') || ':' || coalesce(col_type, '') || ':' || coalesce(description, ''),
+                '|' ORDER BY table_name, column_name), ''))
+             FROM meta.schema_embeddings) AS schemas,
+            (SELECT md5(coalesce(string_agg(id || ':' || coalesce(file_hash, ''), '|' ORDER BY id), ''))
+             FROM meta.example_embeddings) AS examples;
+    """
+
+    rows = execute_sql(sql)
+    if not rows:
+        return None
+
+    return f"{rows[0]['schemas']}:{rows[0]['examples']}"
+
+
+def search_tables(embedding, limit: int = 999) -> Optional[List[dict]]:
+    """ Same rows and scores as vector_db.query_table_embeddings, or None if the index is unavailable. """
+    return _search("schemas", embedding, limit)
+
+
+def search_examples(embedding, limit: int = 999) -> Optional[List[dict]]:
+    """ Same rows and scores as vector_db.query_example_embeddings, or None if the index is unavailable. """
+    return _search("examples", embedding, limit)
+
+
+def _build_corpus(rows):
+    vectors = [json.loads(r.pop("embedding")) for r in rows]
+    matrix = np.asarray(vectors, dtype=np.float32) if vectors else None
+    return {"rows": rows, "matrix": matrix}
+
+
+def _search(name: str, embedding, limit: int):
+    if not VECTOR_INDEX_ENABLED:
+        return None
+    _ensure_fresh()
+
+    with _lock:
+        corpus = _corpora[name]
+    if corpus is None:
+        return None
+    if corpus["matrix"] is None:
+        return []
+
+    # Negative inner product, matches pgvector's <#> operator
+    query = np.asarray(embedding, dtype=np.float32)
+    scores = -(corpus["matrix"] @ query)
+
+    k = min(limit, len(scores))
+    top = np.argpartition(scores, k - 1)[:k]
+    top = top[np.argsort(scores[top])]
+
+    return [{**corpus["rows"][i], "score": float(scores[i])} for i in top]
+
+
+def _ensure_fresh():
+    """ Load on first use (retrying at most every RETRY_SECONDS) and reload whenever the corpus fingerprint changes. """
+    global _checked
+    now = time.time()
+    with _lock:
+        loaded = _corpora["schemas"] is not None
+        if now - _checked < (VECTOR_INDEX_CHECK_SECONDS if loaded else RETRY_SECONDS):
+            return  # Callers fall back to SQL search until the next attempt
+        _checked = now
+
+    if not loaded:
+        refresh()
+        return
+
+    fingerprint = corpus_fingerprint()
+    if fingerprint is not None and fingerprint != _fingerprint:
+        print("[VectorIndex] Corpus changed, reloading")
+        refresh()
@@ -1,11 +1,27 @@
 # backend/main.py
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.routes import router
+from db import async_db, vector_index
+from services import sweeper, tile_cache
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await async_db.open_pool()
+    await run_in_threadpool(vector_index.refresh)
+    await run_in_threadpool(tile_cache.refresh_data_version)
+    sweep_task = asyncio.create_task(sweeper.run())
+    yield
+    sweep_task.cancel()
+    await async_db.close_pool()
 
-app = FastAPI(title="Geoff", version="0.1")
+app = FastAPI(title="Geoff", version="0.1", lifespan=lifespan)
 app.include_router(router)
 
 # Allow requests from localhost
@@ -14,4 +30,4 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"]
-)
\ No newline at end of file
+)
@@ -1,52 +1,121 @@
-import uuid
 import time
 from threading import Lock
 from typing import Optional, Dict, Any
 
-# Module-level state (shared across all requests)
-_store: Dict[str, Dict[str, Any]] = {}
-_lock = Lock()
+from fastapi.concurrency import run_in_threadpool
+
+from config.settings import LAYER_STORE_BACKEND, LAYER_STORE_LOCAL_TTL_SECONDS
+from services.store_backends import make_backend
+from core.sql_canon import layer_id as canonical_layer_id
+
+# Shared backend (see store_backends) so any worker/replica can serve any layer's tiles
+_backend = make_backend("layers")
 TTL_SECONDS = 1800  # 30 minutes
 
-def create_layer(sql_query: str, layer_name: str = None) -> str:
-    layer_id = str(uuid.uuid4())
-    
-    with _lock:
-        _store[layer_id] = {
-            "sql": sql_query,
-            "name": layer_name or f"layer_{layer_id[:8]}",
-            "created": time.time()
-        }
+# Process-local read-through cache in front of shared backends, so tile bursts don't
+# hit Postgres/Redis per tile. Key: layer_id -> (cached_at, layer dict)
+_local: Dict[str, tuple] = {}
+_lock = Lock()
+_use_local = LAYER_STORE_BACKEND != "memory"
+
+def _encode(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    # Id sets are kept as JSON lists in shared backends
+    if _use_local and isinstance(metadata.get("feature_ids"), (set, frozenset)):
+        return {**metadata, "feature_ids": sorted(metadata["feature_ids"])}
+    return metadata
+
+def _decode(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    if isinstance(metadata.get("feature_ids"), list):
+        return {**metadata, "feature_ids": frozenset(metadata["feature_ids"])}
+    return metadata
+
+def create_layer(sql_query: str, layer_name: str = None, metadata: Dict[str, Any] = None) -> str:
+    """
+    Stores a layer under an ID derived from its canonical SQL and name, so identical
+    layers share one entry (and its cached tiles) across queries, sessions and workers.
+    Re-creating an existing layer refreshes its TTL and merges in the new metadata.
+    """
+    layer_name = layer_name or "layer"
+    layer_id = canonical_layer_id(sql_query, layer_name)
+
+    if _backend.touch(layer_id, TTL_SECONDS):
+        if metadata:
+            update_layer(layer_id, **metadata)
+        print(f"[LayerStore] Reusing layer: {layer_id}: {layer_name}")
+        return layer_id
+
+    entry = {
+        "sql": sql_query,
+        "name": layer_name,
+        "meta": _encode(dict(metadata or {})),
+        "created": time.time()
+    }
+    _backend.set(layer_id, entry, TTL_SECONDS)
     print(f"[LayerStore] Created layer: {layer_id}: {layer_name}")
     return layer_id
 
+def _get_local(layer_id: str) -> Optional[Dict[str, Any]]:
+    with _lock:
+        cached = _local.get(layer_id)
+    if cached and time.time() - cached[0] < LAYER_STORE_LOCAL_TTL_SECONDS:
+        return cached[1]
+    return None
+
 def get_layer(layer_id: str) -> Optional[Dict[str, Any]]:
+    if _use_local:
+        layer = _get_local(layer_id)
+        if layer is not None:
+            return layer
+
+    # Expired entries are never returned by the backend
+    entry = _backend.get(layer_id)
+    if not entry:
+        return None
+
+    print(f"[Layer] Retrieving: {layer_id}")
+    layer = {
+        **_decode(entry["meta"]),
+        "sql": entry["sql"],
+        "name": entry["name"]
+    }
+
+    if _use_local:
+        with _lock:
+            _local[layer_id] = (time.time(), layer)
+    return layer
+
+async def aget_layer(layer_id: str) -> Optional[Dict[str, Any]]:
+    """
+    get_layer() for the event loop (tiles, rows pages): the memory backend and local cache
+    hits are answered inline, shared backend reads (blocking Postgres/Redis I/O) run in the threadpool.
+    """
+    if not _use_local:
+        return get_layer(layer_id)
+
+    layer = _get_local(layer_id)
+    if layer is not None:
+        return layer
+    return await run_in_threadpool(get_layer, layer_id)
+
+def update_layer(layer_id: str, **metadata) -> bool:
+    """ Attach metadata (columns, summary, ...) to an existing layer. """
+    # Merged by the backend in one atomic step, so concurrent updates from other workers aren't lost
+    updated = _backend.update(layer_id, _encode(metadata), field="meta")
     with _lock:
-        entry = _store.get(layer_id)
-        
-        if not entry:
-            return None
-        
-        # Check if expired
-        if time.time() - entry["created"] > TTL_SECONDS:
-            del _store[layer_id]
-            return None
-        print(f"[Layer] Retrieving: {layer_id}")
-        return {
-            "sql": entry["sql"],
-            "name": entry["name"]
-        }
+        _local.pop(layer_id, None)
+    return updated
 
 def cleanup_expired() -> int:
+    """ Drops expired layers the backend doesn't expire on its own, and stale local copies. Run by the sweeper. """
     now = time.time()
-    
     with _lock:
-        expired = [
-            layer_id for layer_id, entry in _store.items()
-            if now - entry["created"] > TTL_SECONDS
-        ]
-        
-        for layer_id in expired:
-            del _store[layer_id]
-    
-    return len(expired)
\ No newline at end of file
+        stale = [k for k, (cached_at, _) in _local.items() if now - cached_at >= LAYER_STORE_LOCAL_TTL_SECONDS]
+        for layer_id in stale:
+            del _local[layer_id]
+
+    return _backend.purge_expired()
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        local = len(_local)
+    return {**_backend.stats(), "local_cache": local}
@@ -0,0 +1,119 @@
+import time
+from typing import Optional, Dict, Any
+
+from config.settings import (
+    MATERIALIZE_ENABLED,
+    MATERIALIZE_MIN_SECONDS,
+    MATERIALIZE_MIN_COST,
+    MATERIALIZE_TTL_SECONDS,
+)
+from core.sql_canon import sql_hash
+from db.db import execute_sql
+
+SCHEMA = "layer_cache"
+CLEANUP_INTERVAL_SECONDS = 60
+
+_last_cleanup = 0.0
+
+
+def table_name(sql: str) -> str:
+    """ Deterministic table for a layer's SQL, so identical layers share one materialization. """
+    return f"{SCHEMA}.l_{sql_hash(sql)[:24]}"
+
+
+def layer_sql(layer_data: Dict[str, Any]) -> str:
+    """ SQL that tiles and attribute pages should run for a stored layer. """
+    table = layer_data.get("materialized_table")
+    if table:
+        return f"SELECT * FROM {table};"
+    return layer_data["sql"]
+
+
+def existing(sql: str) -> Optional[str]:
+    """ Returns the live materialized table for this SQL (extending its expiry), if any. """
+    if not MATERIALIZE_ENABLED:
+        return None
+
+    table = table_name(sql)
+    rows = execute_sql(
+        """
+        UPDATE meta.materialized_layers
+        SET expires_at = NOW() + make_interval(secs => %s)
+        WHERE table_name = %s AND expires_at > NOW() AND to_regclass(%s) IS NOT NULL
+        RETURNING table_name;
+        """,
+        (MATERIALIZE_TTL_SECONDS, table, table),
+    )
+    return table if rows else None
+
+
+def should_materialize(sql: str, runtime_seconds: float) -> bool:
+    """ True when the layer is expensive enough that re-running it for every tile is wasteful. """
+    if not MATERIALIZE_ENABLED:
+        return False
+
+    if runtime_seconds >= MATERIALIZE_MIN_SECONDS:
+        print(f"[Materialize] Runtime {runtime_seconds:.3f}s over threshold")
+        return True
+
+    if MATERIALIZE_MIN_COST > 0:
+        rows = execute_sql(f"EXPLAIN (FORMAT JSON) {sql.strip().rstrip(';')};")
+        if rows:
+            cost = rows[0]["QUERY PLAN"][0]["Plan"]["Total Cost"]
+            if cost >= MATERIALIZE_MIN_COST:
+                print(f"[Materialize] Planned cost {cost:.0f} over threshold")
+                return True
+
+    return False
+
+
+def materialize(sql: str) -> Optional[str]:
+    """
+    Stores the layer's result in an unlogged table with GiST (geometry) and id indexes.
+    Returns the table name, or None if the layer can't be materialized (tiles keep using the SQL).
+    """
+    table = table_name(sql)
+    short = table.split(".")[1]
+    start = time.perf_counter()
+
+    result = execute_sql(f"""
+        CREATE UNLOGGED TABLE IF NOT EXISTS {table} AS {sql.strip().rstrip(';')};
+        CREATE INDEX IF NOT EXISTS {short}_geom_idx ON {table} USING GIST (geometry);
+        CREATE INDEX IF NOT EXISTS {short}_id_idx ON {table} (id);
+        ANALYZE {table};
+    """)
+    if result is None:
+        # Lost a creation race or the result isn't storable (e.g. duplicate column names)
+        exists = execute_sql("SELECT to_regclass(%s) IS NOT NULL AS present;", (table,))
+        if not exists or not exists[0]["present"]:
+            return None
+
+    execute_sql(
+        """
+        INSERT INTO meta.materialized_layers (table_name, expires_at)
+        VALUES (%s, NOW() + make_interval(secs => %s))
+        ON CONFLICT (table_name) DO UPDATE SET expires_at = EXCLUDED.expires_at;
+        """,
+        (table, MATERIALIZE_TTL_SECONDS),
+    )
+    print(f"[Materialize] Created {table} in {time.perf_counter() - start:.3f}s")
+    return table
+
+
+def cleanup_expired(force: bool = False) -> int:
+    """ Drops materialized tables past their expiry. Runs at most every CLEANUP_INTERVAL_SECONDS. """
+    global _last_cleanup
+    now = time.time()
+    if not force and now - _last_cleanup < CLEANUP_INTERVAL_SECONDS:
+        return 0
+    _last_cleanup = now
+
+    rows = execute_sql("""
+        DELETE FROM meta.materialized_layers
+        WHERE expires_at <= NOW()
+        RETURNING table_name;
+    """)
+    for row in rows or []:
+        execute_sql(f"DROP TABLE IF EXISTS {row['table_name']};")
+
+    return len(rows or [])
@@ -0,0 +1,154 @@
+import copy
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Dict, Any
+
+import numpy as np
+
+from config.settings import (
+    PLAN_CACHE_TTL_SECONDS,
+    PLAN_CACHE_MAX_ENTRIES,
+    PLAN_CACHE_MAX_DISTANCE,
+    PLAN_CACHE_CORPUS_CHECK_SECONDS,
+)
+from db.vector_index import corpus_fingerprint
+
+# Module-level state (shared across all requests)
+# Key: normalized question -> {"plan": dict, "embedding": np.ndarray | None, "created": float}
+_entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_lock = Lock()
+
+# Near-duplicate tier: stacked unit embeddings, rebuilt lazily after any change
+_matrix: Optional[np.ndarray] = None
+_matrix_keys: list = []
+
+# Corpus fingerprint the cached plans were generated against
+_fingerprint: Optional[str] = None
+_fingerprint_checked = 0.0
+
+
+def normalize_question(question: str) -> str:
+    """ Lowercase, collapse whitespace and drop trailing punctuation. """
+    text = re.sub(r"\s+", " ", question.strip().lower())
+    return text.rstrip(" ?.!")
+
+
+def get_exact(question: str) -> Optional[Dict]:
+    """ Tier 1: plan for a question with identical normalized text. """
+    _check_corpus()
+    key = normalize_question(question)
+
+    with _lock:
+        entry = _entries.get(key)
+        if not entry or _expired(entry):
+            return None
+        _entries.move_to_end(key)
+        print(f"[PlanCache] Exact hit: {key}")
+        return copy.deepcopy(entry["plan"])
+
+
+def literal_tokens(question: str) -> tuple:
+    """ Numbers (with any unit, e.g. "500m", "1.5km") and quoted strings in a normalized question. """
+    return tuple(re.findall(r"\d+(?:\.\d+)?[a-z]*|\"[^\"]*\"|'[^']*'", normalize_question(question)))
+
+
+def get_similar(question: str, embedding) -> Optional[Dict]:
+    """
+    Tier 2: plan for the closest cached question within PLAN_CACHE_MAX_DISTANCE. Questions
+    that differ only in a number or quoted name embed almost identically but need a different
+    plan, so a near hit is only accepted when both questions have the same literal tokens.
+    """
+    if PLAN_CACHE_MAX_DISTANCE <= 0:
+        return None
+    _check_corpus()
+    vector = _unit(embedding)
+    tokens = literal_tokens(question)
+
+    with _lock:
+        matrix, keys = _get_matrix()
+        if matrix is None:
+            return None
+
+        # Cosine distance = 1 - dot product of unit vectors
+        distances = 1.0 - matrix @ vector
+        for i in np.argsort(distances):
+            if distances[i] > PLAN_CACHE_MAX_DISTANCE:
+                break
+            entry = _entries.get(keys[i])
+            if entry and not _expired(entry) and literal_tokens(keys[i]) == tokens:
+                _entries.move_to_end(keys[i])
+                print(f"[PlanCache] Similar hit: {keys[i]} (distance {distances[i]:.4f})")
+                return copy.deepcopy(entry["plan"])
+
+    return None
+
+
+def put(question: str, plan: Dict, embedding=None):
+    global _matrix
+    key = normalize_question(question)
+
+    with _lock:
+        _entries[key] = {
+            "plan": copy.deepcopy(plan),
+            "embedding": _unit(embedding) if embedding is not None else None,
+            "created": time.time(),
+        }
+        _entries.move_to_end(key)
+
+        while len(_entries) > PLAN_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+        _matrix = None
+
+
+def invalidate() -> int:
+    """ Drop every cached plan, e.g. after schema or example embeddings change. """
+    global _matrix
+    with _lock:
+        count = len(_entries)
+        _entries.clear()
+        _matrix = None
+    print(f"[PlanCache] Invalidated {count} plan(s)")
+    return count
+
+
+def _expired(entry) -> bool:
+    return time.time() - entry["created"] > PLAN_CACHE_TTL_SECONDS
+
+
+def _unit(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _get_matrix():
+    """ Caller must hold _lock. """
+    global _matrix, _matrix_keys
+    if _matrix is None:
+        keys = [k for k, e in _entries.items() if e["embedding"] is not None]
+        if not keys:
+            return None, []
+        _matrix = np.vstack([_entries[k]["embedding"] for k in keys])
+        _matrix_keys = keys
+    return _matrix, _matrix_keys
+
+
+def _check_corpus():
+    """ Invalidate when meta.schema_embeddings or meta.example_embeddings change. """
+    global _fingerprint, _fingerprint_checked
+    now = time.time()
+    if now - _fingerprint_checked < PLAN_CACHE_CORPUS_CHECK_SECONDS:
+        return
+    _fingerprint_checked = now
+
+    fingerprint = corpus_fingerprint()
+    if fingerprint is None:
+        return
+
+    if _fingerprint is not None and fingerprint != _fingerprint:
+        print("[PlanCache] Schema/example corpus changed")
+        invalidate()
+    _fingerprint = fingerprint
@@ -0,0 +1,65 @@
+import json
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Dict, Any, List, Tuple
+
+from config.settings import PLAN_STORE_TTL_SECONDS
+from services.store_backends import make_backend
+from core.query_builder import CompiledPlan, compile_plan, PLAN_TEMPLATE_CACHE_MAX
+
+# Executed plans, so /plan/execute can re-run one with tweaked parameters without the
+# LLM. Same backend as the layer store, so any worker can serve any plan ID.
+_backend = make_backend("plans")
+PLAN_NAMESPACE = uuid.UUID("0b6d7c0e-5a8f-4c41-8e0a-2f9a6d3e1c47")
+
+# Process-local: plan_id -> (CompiledPlan, literals). Plan IDs are content hashes, so an
+# entry never goes stale; re-executing a plan binds its literals with no plan walk. LRU.
+_compiled: "OrderedDict[str, Tuple[CompiledPlan, List[Any]]]" = OrderedDict()
+_lock = Lock()
+
+def save_plan(plan: Dict[str, Any], compiled: Optional[Tuple[CompiledPlan, List[Any]]] = None) -> str:
+    """
+    Stores a plan under an ID derived from its content; saving an identical plan refreshes its TTL.
+    compiled is the plan's (CompiledPlan, literals) from query_builder.compile_plan, if already at hand.
+    """
+    plan_id = str(uuid.uuid5(PLAN_NAMESPACE, json.dumps(plan, sort_keys=True)))
+
+    if not _backend.touch(plan_id, PLAN_STORE_TTL_SECONDS):
+        _backend.set(plan_id, {"plan": plan}, PLAN_STORE_TTL_SECONDS)
+        print(f"[PlanStore] Stored plan: {plan_id}")
+    if compiled is not None:
+        _remember(plan_id, compiled)
+    return plan_id
+
+def get_plan(plan_id: str) -> Optional[Dict[str, Any]]:
+    entry = _backend.get(plan_id)
+    return entry["plan"] if entry else None
+
+def get_compiled(plan_id: str) -> Optional[Tuple[CompiledPlan, List[Any]]]:
+    """ (CompiledPlan, literals) for a stored plan, compiled once per process. None if unknown or expired. """
+    with _lock:
+        compiled = _compiled.get(plan_id)
+        if compiled is not None:
+            _compiled.move_to_end(plan_id)
+    # The backend stays the source of truth for expiry
+    if compiled is not None and _backend.touch(plan_id, PLAN_STORE_TTL_SECONDS):
+        return compiled
+
+    plan = get_plan(plan_id)
+    if plan is None:
+        return None
+    compiled = compile_plan(plan)
+    _remember(plan_id, compiled)
+    return compiled
+
+def _remember(plan_id: str, compiled: Tuple[CompiledPlan, List[Any]]):
+    with _lock:
+        _compiled[plan_id] = compiled
+        _compiled.move_to_end(plan_id)
+        while len(_compiled) > PLAN_TEMPLATE_CACHE_MAX:
+            _compiled.popitem(last=False)
+
+def cleanup_expired() -> int:
+    """ Drops expired plans the backend doesn't expire on its own. Run by the sweeper. """
+    return _backend.purge_expired()
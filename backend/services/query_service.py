@@ -1,3 +1,4 @@
+import json
 import logging
 import uuid
 import time
@@ -5,12 +6,14 @@ from datetime import datetime
 
 from utils.embed import embed_text
 from db.vector_db import select_relevant_tables, select_relevant_examples
-from core.parse_results import parse_results
-from core.query_builder import build_query
-from services import layer_store
+from core.parse_results import parse_results, register_layer, layer_metadata, layer_summary, load_layers, tile_metadata
+from core.query_builder import build_query, build_query_params, describe_layers, compile_plan
+from services import layer_store, plan_cache, plan_store
 
 from core import llm, prompt_builder
 
+STREAM_ROWS_CHUNK = 500  # Table rows per streamed "rows" event
+
 logging.basicConfig(
     filename="logs/query_service.log",
     level=logging.INFO,
@@ -22,34 +25,13 @@ def handle_user_query(user_question: str, retries: int = 2):
     request_id = str(uuid.uuid4())
     logging.info("[%s] User Question: %s", request_id, user_question)
     
-    # Cleanup expired layers on each new query (lazy cleanup)
-    expired_count = layer_store.cleanup_expired()
-    if expired_count > 0: logging.info("[%s] Cleaned up %d expired layer(s)", request_id, expired_count)
-
-    # 1. Embed the input
-    question_embedding = embed_text(user_question)
-    
-    # 2: Select relevant tables and examples
-    relevant_tables = select_relevant_tables(question_embedding)
-    #print(f"[MAIN] Relevant tables: {relevant_tables}")
-
-    # 3: Fetch schema and column descriptions for relevant tables and put in text form for prompting
-    schema_text = prompt_builder.build_schema_prompt(relevant_tables)
+    # 1-6: Resolve the JSON plan (cached, or embed + retrieve + LLM)
+    plan_raw, question_embedding, cache_status = _resolve_plan(user_question)
 
-    # 4: Fetch most similar examples and put in text form for prompting
-    relevant_examples = select_relevant_examples(question_embedding)
-    examples_text = prompt_builder.build_examples_prompt(relevant_examples)
-
-    # 5: Build full prompt
-    prompt = prompt_builder.build_full_prompt(user_question, schema_text, examples_text)
-    #print(f"[MAIN] Prompt generated", prompt)
-
-    # 6: Call LLM to generate raw JSON plan
-    plan_raw = llm.generate_json_plan(prompt)
-    print(f"[MAIN] Plan: {type(plan_raw)}, {plan_raw}")
-    
     duration = time.time() - start_time
-    logging.info("[%s] Plan Generated | Duration: %.3f sec", request_id, duration)
+    logging.info("[%s] Plan Generated (cache %s) | Duration: %.3f sec", request_id, cache_status, duration)
+    # Machine-readable for `run_etl.py advise`, which mines executed plans for filter patterns
+    logging.info("[%s] Plan: %s", request_id, json.dumps(plan_raw))
     
     # import json
     # plan_raw = json.loads('''
@@ -59,25 +41,195 @@ def handle_user_query(user_question: str, retries: int = 2):
     # 7: Validate plan
     # plan = validate_json.plan.validate(plan_raw)
 
-    # 8: Turn JSON Plan to SQL
-    sql_queries = build_query(plan_raw)
+    # 8: Turn JSON Plan to SQL (compiled once per plan structure)
+    compiled, literals = compile_plan(plan_raw)
+    sql_queries = compiled.render(literals)
     print("[MAIN] Result: ", sql_queries)
     
-    # 9: Execute SQL statements
-    layers = parse_results(sql_queries)
+    # 9: Execute SQL statements (as parameterized templates; the SQL text identifies the layer)
+    layers = parse_results(sql_queries, compiled.descriptions, compiled.bind(literals))
+    logging.info("[%s] Generated SQL: %s", request_id, sql_queries)
+
+    # Only cache plans that built and executed
+    if cache_status != "EXACT":
+        plan_cache.put(user_question, plan_raw, question_embedding)
+    # Stored so /plan/execute can re-run it with tweaked parameters
+    plan_id = plan_store.save_plan(plan_raw, (compiled, literals))
+
+
+    duration = time.time() - start_time
+    logging.info("[%s] Execution Status: SUCCESS | Duration: %.3f sec", request_id, duration)
+
+    return {
+            "sql": "",
+            "plan_id": plan_id,
+            "layers": layers,
+            "error": None,
+    }
+
+
+def stream_user_query(user_question: str):
+    """
+    Generator variant of handle_user_query that yields events as stages finish:
+    plan -> layer (tile URL, per layer) -> columns + first page of rows (per layer) -> done.
+    All layers are registered before any SQL runs so the map can start fetching tiles.
+    When the plan comes from the LLM it is streamed, and each layer is built and
+    registered as soon as its JSON object is complete, so layer events precede plan.
+    """
+    start_time = time.time()
+    request_id = str(uuid.uuid4())
+    logging.info("[%s] User Question (stream): %s", request_id, user_question)
+
+    sql_queries, tiles, layers = [], [], []
+
+    def add_layer(layer_obj):
+        # Layers are built one at a time, in plan order (index = position in the plan)
+        single = {"layers": [layer_obj]}
+        sql_queries.append(build_query(single)[0])
+        tiles.append(tile_metadata(describe_layers(single)[0]))
+        layers.append(register_layer(sql_queries[-1], len(layers), tiles[-1]))
+        return {"event": "layer", **layers[-1]}
+
+    try:
+        plan_raw, question_embedding, cache_status = _cached_plan(user_question)
+        if plan_raw is None:
+            for kind, value in llm.stream_json_plan(_build_prompt(user_question, question_embedding)):
+                if kind == "layer":
+                    yield add_layer(value)
+                else:
+                    plan_raw = value
+
+        logging.info("[%s] Plan Generated (cache %s) | Duration: %.3f sec", request_id, cache_status, time.time() - start_time)
+        logging.info("[%s] Plan: %s", request_id, json.dumps(plan_raw))
+        yield {"event": "plan", "plan": plan_raw, "plan_id": plan_store.save_plan(plan_raw), "cache": cache_status}
+
+        # Cached plans (and anything the incremental parser didn't emit)
+        for layer_obj in plan_raw["layers"][len(layers):]:
+            yield add_layer(layer_obj)
+        logging.info("[%s] Generated SQL: %s", request_id, sql_queries)
+
+        # Layers are emitted in completion order, not plan order
+        for index, data in load_layers(sql_queries, tiles, build_query_params(plan_raw)):
+            layer = layers[index]
+            if not data:
+                yield {"event": "columns", "layer_id": layer["layer_id"], "columns": [], "feature_count": 0, "bounds": None, "minzoom": 0, "maxzoom": 0}
+                continue
+
+            layer_store.update_layer(layer["layer_id"], **layer_metadata(data), feature_ids=data["feature_ids"])
+            yield {"event": "columns", "layer_id": layer["layer_id"], **layer_summary(data)}
+
+            # First page inline; further pages come from the layer's rows_url
+            rows = data["rows"]
+            for i in range(0, len(rows), STREAM_ROWS_CHUNK):
+                yield {"event": "rows", "layer_id": layer["layer_id"], "rows": rows[i:i + STREAM_ROWS_CHUNK]}
+            yield {"event": "rows_end", "layer_id": layer["layer_id"], "next_cursor": data["next_cursor"], "rows_url": layer["rows_url"]}
+
+        if cache_status != "EXACT":
+            plan_cache.put(user_question, plan_raw, question_embedding)
+
+    except Exception as e:
+        logging.exception("[%s] Execution Status: FAILED", request_id)
+        yield {"event": "error", "error": str(e)}
+        return
+
+    duration = time.time() - start_time
+    logging.info("[%s] Execution Status: SUCCESS | Duration: %.3f sec", request_id, duration)
+    yield {"event": "done", "duration": duration}
+
+
+def get_plan_params(plan_id: str):
+    """ A stored plan and its tweakable parameters (literal values by path), or None if unknown. """
+    stored = plan_store.get_compiled(plan_id)
+    if stored is None:
+        return None
+
+    compiled, literals = stored
+    params = [{"path": path, "kind": kind, "value": value} for (path, kind), value in zip(compiled.slots, literals)]
+    return {"plan_id": plan_id, "plan": compiled.plan(literals), "params": params}
+
+
+def execute_plan(plan_id: str, params: dict):
+    """
+    Re-runs a stored plan with some parameters replaced, without embedding, vector search
+    or the LLM. params maps parameter paths (see get_plan_params) to new values, e.g.
+    {"layers.0.query.spatial_filters.0.distance": 750}. Layers whose SQL is unchanged keep
+    their content-addressed layer IDs, so their summaries and cached tiles are reused.
+    Returns None for an unknown plan; raises ValueError for an invalid parameter.
+    """
+    start_time = time.time()
+    request_id = str(uuid.uuid4())
+    logging.info("[%s] Plan Execute: %s %s", request_id, plan_id, json.dumps(params))
+
+    # Compiled once per stored plan: new literals are bound into its templates, no plan walk
+    stored = plan_store.get_compiled(plan_id)
+    if stored is None:
+        return None
+
+    compiled, literals = stored
+    literals = compiled.patch(literals, params)
+    sql_queries = compiled.render(literals)
     logging.info("[%s] Generated SQL: %s", request_id, sql_queries)
 
+    layers = parse_results(sql_queries, compiled.descriptions, compiled.bind(literals))
 
     duration = time.time() - start_time
     logging.info("[%s] Execution Status: SUCCESS | Duration: %.3f sec", request_id, duration)
 
     return {
             "sql": "",
+            # Stored from the same literals that ran, so the plan and its SQL can't diverge
+            "plan_id": plan_store.save_plan(compiled.plan(literals), (compiled, literals)),
             "layers": layers,
             "error": None,
     }
 
 
+def _resolve_plan(user_question: str):
+    """ Returns (plan, question embedding or None, cache status: EXACT | SIMILAR | MISS). """
+    plan_raw, question_embedding, cache_status = _cached_plan(user_question)
+
+    if plan_raw is None:
+        plan_raw = llm.generate_json_plan(_build_prompt(user_question, question_embedding))
+        print(f"[MAIN] Plan: {type(plan_raw)}, {plan_raw}")
+
+    return plan_raw, question_embedding, cache_status
+
+
+def _cached_plan(user_question: str):
+    """ Returns (cached plan or None, question embedding or None, cache status: EXACT | SIMILAR | MISS). """
+    # 1. Reuse a cached plan for the same question (exact text, then near-duplicate embedding)
+    question_embedding = None
+    cache_status = "EXACT"
+    plan_raw = plan_cache.get_exact(user_question)
+    if plan_raw is None:
+        question_embedding = embed_text(user_question)
+        cache_status = "SIMILAR"
+        plan_raw = plan_cache.get_similar(user_question, question_embedding)
+
+    if plan_raw is None:
+        cache_status = "MISS"
+
+    return plan_raw, question_embedding, cache_status
+
+
+def _build_prompt(user_question: str, question_embedding):
+    # 2: Select relevant tables and examples
+    relevant_tables = select_relevant_tables(question_embedding)
+    #print(f"[MAIN] Relevant tables: {relevant_tables}")
+
+    # 3: Fetch schema and column descriptions for relevant tables and put in text form for prompting
+    schema_text = prompt_builder.build_schema_prompt(relevant_tables)
+
+    # 4: Fetch most similar examples and put in text form for prompting
+    relevant_examples = select_relevant_examples(question_embedding)
+    examples_text = prompt_builder.build_examples_prompt(relevant_examples)
+
+    # 5: Build full prompt (6: the LLM turns it into the raw JSON plan)
+    prompt = prompt_builder.build_full_prompt(user_question, schema_text, examples_text)
+    #print(f"[MAIN] Prompt generated", prompt)
+    return prompt
+
+
 def handle_manual_query(user_query: str):
     try: 
         rows, colnames, er = db.execute_sql(user_query)
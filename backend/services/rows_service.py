@@ -0,0 +1,43 @@
+from typing import Optional
+
+from config.settings import ROWS_PAGE_MAX
+from db.async_db import execute_sql
+from services import layer_store, materialize
+from core import rows_builder
+
+
+async def get_rows(layer_id: str, after=None, limit: int = 100) -> Optional[dict]:
+    """
+    Returns one keyset page of a layer's attribute rows (geometry projected out),
+    or None if the layer is unknown. Pass the returned next_cursor as `after`.
+    """
+    layer_data = await layer_store.aget_layer(layer_id)
+    if not layer_data or "columns" not in layer_data:
+        return None
+
+    base_query = materialize.layer_sql(layer_data)
+    columns = layer_data["columns"]
+    limit = max(1, min(limit, ROWS_PAGE_MAX))
+    keyed = "id" in columns
+
+    sql, params = rows_builder.build_page_query(base_query, columns, after, limit, keyed=keyed)
+    rows = await execute_sql(sql, params)
+    if rows is None and layer_data.get("materialized_table"):
+        # Materialization dropped underneath us (see tile_service._render) - read the layer SQL
+        base_query = layer_data["sql"]
+        sql, params = rows_builder.build_page_query(base_query, columns, after, limit, keyed=keyed)
+        rows = await execute_sql(sql, params)
+
+    tail_rows = None
+    if keyed and rows and len(rows) >= limit:
+        sql, params = rows_builder.build_id_rows_query(base_query, columns, rows[-1]["id"])
+        tail_rows = await execute_sql(sql, params)
+
+    table_rows, next_cursor = rows_builder.finish_page(rows, tail_rows, columns, limit)
+
+    return {
+        "layer_id": layer_id,
+        "columns": columns,
+        "rows": table_rows,
+        "next_cursor": next_cursor if keyed else None,
+    }
@@ -0,0 +1,96 @@
+import os
+import sqlite3
+from threading import Lock
+from typing import Optional, Dict, Any
+
+from config.settings import STATIC_TILES_DIR
+
+# Pre-rendered MBTiles pyramids written by `run_etl.py tiles` (one file per data.* table).
+# Files are opened read-only and immutable with SQLite memory-mapped I/O, so tile reads
+# come straight from the page cache without copying through SQLite's buffer pool.
+MMAP_SIZE = 1024 * 1024 * 1024  # Map up to 1 GB of each file
+
+# Module-level state (shared across all requests)
+# Key: table -> {"conn": sqlite3.Connection, "mtime": float, "minzoom": int, "maxzoom": int}
+_files: Dict[str, Dict[str, Any]] = {}
+_lock = Lock()
+
+
+def _path(table: str) -> Optional[str]:
+    if not STATIC_TILES_DIR or not table.replace("_", "").isalnum():
+        return None
+    return os.path.join(STATIC_TILES_DIR, f"{table}.mbtiles")
+
+
+def _open(table: str) -> Optional[Dict[str, Any]]:
+    """ Returns the open file for a table, reopening it when the ETL has replaced it. """
+    path = _path(table)
+    if not path:
+        return None
+
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _lock:
+        entry = _files.get(table)
+        if entry and entry["mtime"] == mtime:
+            return entry
+
+        conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        metadata = dict(conn.execute("SELECT name, value FROM metadata").fetchall())
+
+        # The old connection isn't closed here: readers may still be executing on it.
+        # Swapping the entry drops our reference, and sqlite closes it with the last one.
+        entry = {
+            "conn": conn,
+            "mtime": mtime,
+            "minzoom": int(metadata.get("minzoom", 0)),
+            "maxzoom": int(metadata.get("maxzoom", 16)),
+        }
+        _files[table] = entry
+        print(f"[StaticTiles] Opened {path} (z{entry['minzoom']}-z{entry['maxzoom']})")
+        return entry
+
+
+def available(table: str) -> bool:
+    """ True when a pre-rendered pyramid exists for the table. """
+    return _open(table) is not None
+
+
+def max_zoom(table: str) -> Optional[int]:
+    """ Deepest pre-rendered zoom for the table, or None without a pyramid. """
+    entry = _open(table)
+    return entry["maxzoom"] if entry else None
+
+
+def version(table: str) -> Optional[float]:
+    """ Changes whenever the ETL re-renders the table (file mtime), for tile ETags. """
+    entry = _open(table)
+    return entry["mtime"] if entry else None
+
+
+def tile_url(table: str) -> str:
+    return f"/api/tiles/static/{table}/{{z}}/{{x}}/{{y}}.pbf"
+
+
+def get_tile(table: str, z: int, x: int, y: int) -> Optional[bytes]:
+    """
+    Returns the stored tile (gzip-compressed MVT, or raw from older pyramids - see
+    tile_encoding.sniff), b"" for a tile with no features, or None if the table has no pyramid.
+    """
+    entry = _open(table)
+    if not entry:
+        return None
+
+    if z < entry["minzoom"] or z > entry["maxzoom"]:
+        return b""
+
+    # MBTiles rows are TMS (y flipped)
+    row = entry["conn"].execute(
+        "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+        (z, x, 2 ** z - 1 - y),
+    ).fetchone()
+    return bytes(row[0]) if row else b""
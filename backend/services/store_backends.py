@@ -0,0 +1,217 @@
+import heapq
+import json
+import time
+from threading import Lock
+from typing import Optional, Dict, Any, List
+
+from config.settings import LAYER_STORE_BACKEND, REDIS_URL
+
+# Key-value backends with per-entry TTL for app state that every worker/replica must
+# see (layers). Values are JSON-serializable dicts. Pick one with LAYER_STORE_BACKEND:
+#   memory   - process-local dict (single worker only)
+#   postgres - meta.<namespace> table, expiry via expires_at
+#   redis    - any Redis-compatible server at REDIS_URL, expiry via native key TTL
+
+
+class MemoryBackend:
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._data: Dict[str, tuple] = {}  # key -> (expires_at, value)
+        # Min-heap of (expires_at, key); purging pops only what has expired. Entries
+        # superseded by set/touch/delete are skipped when they surface.
+        self._expiry: List[tuple] = []
+        self._lock = Lock()
+        self._evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if not entry or entry[0] <= time.time():
+                return None  # Left for purge_expired
+            return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            heapq.heappush(self._expiry, (expires_at, key))
+
+    def update(self, key: str, fields: Dict[str, Any], field: Optional[str] = None) -> bool:
+        """
+        Atomically merge fields into an existing value (or into its object at value[field]),
+        keeping its expiry. Concurrent updates of different fields never lose each other.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if not entry or entry[0] <= time.time():
+                return False
+            target = entry[1].setdefault(field, {}) if field else entry[1]
+            target.update(fields)
+            return True
+
+    def touch(self, key: str, ttl: int) -> bool:
+        expires_at = time.time() + ttl
+        with self._lock:
+            entry = self._data.get(key)
+            if not entry or entry[0] <= time.time():
+                return False
+            self._data[key] = (expires_at, entry[1])
+            heapq.heappush(self._expiry, (expires_at, key))
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def purge_expired(self) -> int:
+        """ O(expired log n): pops heap entries up to now instead of scanning every key. """
+        now = time.time()
+        purged = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiry)
+                entry = self._data.get(key)
+                if entry and entry[0] == expires_at:
+                    del self._data[key]
+                    purged += 1
+
+            # Touches leave stale heap entries behind; rebuild if they dominate
+            if len(self._expiry) > 2 * len(self._data) + 1024:
+                self._expiry = [(expires_at, key) for key, (expires_at, _) in self._data.items()]
+                heapq.heapify(self._expiry)
+
+            self._evictions += purged
+        return purged
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "memory", "size": len(self._data), "expiry_queue": len(self._expiry), "evictions": self._evictions}
+
+
+class PostgresBackend:
+    def __init__(self, namespace: str):
+        from db.db import execute_sql
+        self._execute = execute_sql
+        self.table = f"meta.{namespace}"
+        self._evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        rows = self._execute(
+            f"SELECT value FROM {self.table} WHERE key = %s AND expires_at > NOW();",
+            (key,),
+        )
+        return rows[0]["value"] if rows else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        self._execute(
+            f"""
+            INSERT INTO {self.table} (key, value, expires_at)
+            VALUES (%s, %s::jsonb, NOW() + make_interval(secs => %s))
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at;
+            """,
+            (key, json.dumps(value), ttl),
+        )
+
+    def update(self, key: str, fields: Dict[str, Any], field: Optional[str] = None) -> bool:
+        # Merged inside the UPDATE, so the row lock serializes concurrent writers
+        if field:
+            sql = f"""
+            UPDATE {self.table} SET value = jsonb_set(value, ARRAY[%s], coalesce(value->%s, '{{}}'::jsonb) || %s::jsonb)
+            WHERE key = %s AND expires_at > NOW()
+            RETURNING key;
+            """
+            params = (field, field, json.dumps(fields), key)
+        else:
+            sql = f"""
+            UPDATE {self.table} SET value = value || %s::jsonb
+            WHERE key = %s AND expires_at > NOW()
+            RETURNING key;
+            """
+            params = (json.dumps(fields), key)
+        return bool(self._execute(sql, params))
+
+    def touch(self, key: str, ttl: int) -> bool:
+        rows = self._execute(
+            f"""
+            UPDATE {self.table} SET expires_at = NOW() + make_interval(secs => %s)
+            WHERE key = %s AND expires_at > NOW()
+            RETURNING key;
+            """,
+            (ttl, key),
+        )
+        return bool(rows)
+
+    def delete(self, key: str):
+        self._execute(f"DELETE FROM {self.table} WHERE key = %s;", (key,))
+
+    def purge_expired(self) -> int:
+        # Index range scan on expires_at: cost grows with expired rows, not table size
+        rows = self._execute(f"DELETE FROM {self.table} WHERE expires_at <= NOW() RETURNING key;")
+        self._evictions += len(rows or [])
+        return len(rows or [])
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._execute(f"SELECT count(*) AS size FROM {self.table} WHERE expires_at > NOW();")
+        return {"backend": "postgres", "size": rows[0]["size"] if rows else None, "evictions": self._evictions}
+
+
+class RedisBackend:
+    # Native key expiry: nothing to purge
+    def __init__(self, namespace: str):
+        import redis  # Optional dependency, only needed for this backend
+        self._redis = redis.Redis.from_url(REDIS_URL)
+        self.prefix = f"geoff:{namespace}:"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        self._redis.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def update(self, key: str, fields: Dict[str, Any], field: Optional[str] = None) -> bool:
+        name = self.prefix + key
+
+        # Optimistic transaction: WATCH the key, merge, and retry if another writer changed it first
+        def merge(pipe) -> bool:
+            raw = pipe.get(name)
+            if not raw:
+                return False
+            value = json.loads(raw)
+            if field:
+                value[field] = {**value.get(field, {}), **fields}
+            else:
+                value.update(fields)
+            pipe.multi()
+            pipe.set(name, json.dumps(value), keepttl=True, xx=True)
+            return True
+
+        return self._redis.transaction(merge, name, value_from_callable=True)
+
+    def touch(self, key: str, ttl: int) -> bool:
+        return bool(self._redis.expire(self.prefix + key, ttl))
+
+    def delete(self, key: str):
+        self._redis.delete(self.prefix + key)
+
+    def purge_expired(self) -> int:
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        info = self._redis.info("stats")
+        # Keys expire natively, so only the server-wide count (every namespace and client) is available
+        return {"backend": "redis", "server_expired_keys": info.get("expired_keys")}
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "postgres": PostgresBackend,
+    "redis": RedisBackend,
+}
+
+
+def make_backend(namespace: str, kind: str = LAYER_STORE_BACKEND):
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown store backend: {kind} (expected one of {', '.join(BACKENDS)})")
+    print(f"[Store] {namespace}: {kind} backend")
+    return BACKENDS[kind](namespace)
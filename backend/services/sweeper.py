@@ -0,0 +1,37 @@
+import asyncio
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+from config.settings import SWEEP_INTERVAL_SECONDS
+from services import layer_store, plan_store, materialize, tile_cache
+
+_stats = {"runs": 0, "layers_expired": 0, "plans_expired": 0, "tables_dropped": 0}
+
+
+async def run():
+    """ Background task (started by the FastAPI lifespan hook) that expires layers, plans and materializations and picks up data reloads. """
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(sweep)
+        except Exception:
+            logging.exception("[Sweeper] Sweep failed")
+
+
+def sweep():
+    expired_count = layer_store.cleanup_expired()
+    plans_count = plan_store.cleanup_expired()
+    dropped_count = materialize.cleanup_expired(force=True)
+    tile_cache.refresh_data_version()
+
+    _stats["runs"] += 1
+    _stats["layers_expired"] += expired_count
+    _stats["plans_expired"] += plans_count
+    _stats["tables_dropped"] += dropped_count
+    if expired_count or plans_count or dropped_count:
+        logging.info("[Sweeper] Expired %d layer(s) and %d plan(s), dropped %d materialized layer(s)", expired_count, plans_count, dropped_count)
+
+
+def stats() -> dict:
+    return {"interval_seconds": SWEEP_INTERVAL_SECONDS, **_stats}
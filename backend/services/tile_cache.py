@@ -0,0 +1,239 @@
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Dict, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from config.settings import TILE_CACHE_MAX_BYTES, TILE_CACHE_DIR, TILE_CACHE_DISK_MAX_BYTES
+from core.tile_encoding import ENCODING
+from core.sql_canon import sql_hash
+from db.db import execute_sql
+
+# Module-level state (shared across all requests)
+# Key: (layer_key, z, x, y) -> {"data": bytes, "hits": int}
+_entries: "OrderedDict[Tuple[str, int, int, int], dict]" = OrderedDict()
+_lock = Lock()
+_bytes = 0
+
+# Disk tier index: file path -> size, least recently used first. Built by one scan of
+# TILE_CACHE_DIR on first use, then kept current by reads, writes and evictions
+_disk_files: "Optional[OrderedDict[str, int]]" = None
+_disk_bytes = 0
+_disk_scan_lock = Lock()
+
+# Version of the loaded data (meta.datasets), part of every layer key so tiles cached
+# before an ETL load - in memory or on disk - are never served afterwards
+_data_version = ""
+
+ENTRY_OVERHEAD = 64    # Rough per-entry bookkeeping cost so empty tiles still count
+EVICTION_SAMPLE = 8    # Number of least recently used entries considered per eviction
+
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+def layer_key(sql: str, layer_name: str, source_version=None) -> str:
+    """
+    Hash identifying a layer's tiles, shared by every layer with the same canonical SQL. Tiles are
+    cached in ENCODING. source_version is the version of any other input the tiles are cut from
+    (e.g. a pre-rendered pyramid), so the key also changes when that is rebuilt.
+    """
+    return sql_hash(sql, layer_name, ENCODING, _data_version, str(source_version or ""))
+
+
+def refresh_data_version() -> str:
+    """ Re-reads the data version from meta.datasets. Run at startup and by the sweeper. """
+    global _data_version
+    rows = execute_sql("""
+        SELECT md5(coalesce(string_agg(
+            dataset_name || ':' || coalesce(last_ingested::text, '') || ':' || coalesce(last_loaded::text, ''),
+            '|' ORDER BY dataset_name), '')) AS version
+        FROM meta.datasets;
+    """)
+    if rows:
+        version = rows[0]["version"]
+        if _data_version and version != _data_version:
+            print("[TileCache] Data reloaded, cached tiles invalidated")
+        _data_version = version
+    return _data_version
+
+
+async def get(key: str, z: int, x: int, y: int) -> Optional[bytes]:
+    """ Returns cached tile bytes (b"" for a known-empty tile) or None on a miss. Disk reads run in the threadpool. """
+    cache_key = (key, z, x, y)
+
+    with _lock:
+        entry = _entries.get(cache_key)
+        if entry is not None:
+            entry["hits"] += 1
+            _entries.move_to_end(cache_key)
+            _stats["hits"] += 1
+            return entry["data"]
+
+    data = await run_in_threadpool(_disk_get, cache_key) if TILE_CACHE_DIR else None
+    if data is None:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+
+    # Promote disk hits into memory
+    with _lock:
+        _stats["disk_hits"] += 1
+    _memory_put(cache_key, data)
+    return data
+
+
+async def put(key: str, z: int, tiles: Dict[Tuple[int, int], bytes]):
+    """ Caches tiles of one zoom ({(x, y): bytes}) in memory, and on disk from the threadpool. """
+    for (x, y), data in tiles.items():
+        _memory_put((key, z, x, y), data)
+    if TILE_CACHE_DIR and tiles:
+        await run_in_threadpool(_disk_put_many, key, z, tiles)
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "entries": len(_entries),
+            "bytes": _bytes,
+            "max_bytes": TILE_CACHE_MAX_BYTES,
+            "disk_bytes": _disk_bytes,
+            **_stats,
+        }
+
+
+# --- Memory tier ---
+def _memory_put(cache_key, data: bytes):
+    global _bytes
+    size = len(data) + ENTRY_OVERHEAD
+    if size > TILE_CACHE_MAX_BYTES:
+        return
+
+    with _lock:
+        old = _entries.pop(cache_key, None)
+        if old is not None:
+            _bytes -= len(old["data"]) + ENTRY_OVERHEAD
+
+        while _entries and _bytes + size > TILE_CACHE_MAX_BYTES:
+            _evict_one()
+
+        _entries[cache_key] = {"data": data, "hits": 0 if old is None else old["hits"]}
+        _bytes += size
+
+
+def _evict_one():
+    """
+    Zoom-aware LRU/LFU eviction. Of the least recently used entries, drop the one
+    with the fewest hits, preferring high-zoom tiles: they cover a small area and
+    are cheap to rebuild, while low-zoom tiles scan most of the layer.
+    Caller must hold _lock.
+    """
+    global _bytes
+    candidates = []
+    for cache_key, entry in _entries.items():
+        candidates.append((entry["hits"], -cache_key[1], cache_key))
+        if len(candidates) >= EVICTION_SAMPLE:
+            break
+
+    _, _, victim = min(candidates)
+    entry = _entries.pop(victim)
+    _bytes -= len(entry["data"]) + ENTRY_OVERHEAD
+    _stats["evictions"] += 1
+
+
+# --- Disk tier ---
+def _disk_path(cache_key) -> str:
+    key, z, x, y = cache_key
+    return os.path.join(TILE_CACHE_DIR, key[:2], key, str(z), str(x), f"{y}.pbf")
+
+
+def _disk_get(cache_key) -> Optional[bytes]:
+    _disk_load()
+    path = _disk_path(cache_key)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # Keeps the LRU order across restarts
+    except OSError:
+        return None
+
+    with _lock:
+        if path in _disk_files:
+            _disk_files.move_to_end(path)
+    return data
+
+
+def _disk_put_many(key: str, z: int, tiles: Dict[Tuple[int, int], bytes]):
+    global _disk_bytes
+    _disk_load()
+    written = []
+    for (x, y), data in tiles.items():
+        path = _disk_path((key, z, x, y))
+        tmp_path = f"{path}.{os.getpid()}.{time.time_ns()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # Atomic so readers never see partial tiles
+        except OSError as e:
+            print(f"[TileCache] Disk write failed: {e}")
+            continue
+        written.append((path, len(data)))
+
+    with _lock:
+        for path, size in written:
+            _disk_bytes += size - _disk_files.pop(path, 0)
+            _disk_files[path] = size
+        over_budget = _disk_bytes > TILE_CACHE_DISK_MAX_BYTES
+
+    if over_budget:
+        _disk_evict()
+
+
+def _disk_load():
+    """ Indexes the files already on disk (oldest first), once per process. """
+    global _disk_files, _disk_bytes
+    if _disk_files is not None:
+        return
+
+    with _disk_scan_lock:
+        if _disk_files is not None:
+            return
+
+        files = []
+        for root, _, names in os.walk(TILE_CACHE_DIR):
+            for name in names:
+                if not name.endswith(".pbf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, path, st.st_size))
+
+        index = OrderedDict((path, size) for _, path, size in sorted(files))
+        with _lock:
+            _disk_files = index
+            _disk_bytes = sum(index.values())
+
+
+def _disk_evict():
+    """ Remove least recently used files until the disk tier is back under 90% of budget. """
+    global _disk_bytes
+    target = TILE_CACHE_DISK_MAX_BYTES * 0.9
+
+    victims = []
+    with _lock:
+        while _disk_files and _disk_bytes > target:
+            path, size = _disk_files.popitem(last=False)
+            _disk_bytes -= size
+            victims.append(path)
+        total = _disk_bytes
+
+    for path in victims:
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+    print(f"[TileCache] Disk tier trimmed to {total} bytes")
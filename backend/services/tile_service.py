@@ -0,0 +1,163 @@
+import asyncio
+from typing import Optional, Dict, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from config.settings import TILE_DB_CONCURRENCY, METATILE_SIZE, METATILE_MIN_ZOOM
+from db.async_db import execute_sql
+from services import layer_store
+from services import tile_cache
+from services import materialize
+from services import static_tiles
+from core import mvt_builder, mvt_filter, tile_encoding
+
+# Module-level state (shared across all requests, single event loop)
+# Key: (layer SQL hash, z, block x, block y, block size) -> render task that concurrent
+# requests for any tile in the block all await. The task returns {(x, y): tile bytes}.
+_inflight: Dict[Tuple[str, int, int, int, int], asyncio.Task] = {}
+
+# Tile queries running at once; the rest wait here instead of queueing on the pool,
+# leaving connections for /schemas, /examples and rows pages
+_db_slots = asyncio.Semaphore(TILE_DB_CONCURRENCY)
+
+_stats = {"rendered": 0, "coalesced": 0}
+
+
+async def get_tile(layer_id: str, z: int, x: int, y: int, if_none_match: Optional[str] = None, accept_encoding: str = "") -> Optional[Dict]:
+    """
+    Returns None if the layer is unknown, otherwise
+        {"data": tile bytes in tile_encoding.ENCODING (b"" for an empty tile), "etag": str, "not_modified": bool}
+    Tiles are cached by layer SQL hash, so layers with identical SQL share tiles. A matching
+    If-None-Match is answered from the ETag alone (not_modified, no data) without SQL. The ETag
+    is that of the variant Accept-Encoding selects, so decoded responses revalidate too.
+    """
+    layer_data = await layer_store.aget_layer(layer_id)
+    if not layer_data:
+        return None
+
+    # Answer tiles that can't contain features from the stored summary, without the database
+    if _known_empty(layer_data, z, x, y):
+        return {"data": b"", "etag": None, "not_modified": False}
+
+    # Filtered layers are cut from a pre-rendered pyramid, which changes when the ETL re-renders it
+    table = layer_data.get("filter_table")
+    key = tile_cache.layer_key(layer_data["sql"], layer_data["name"], static_tiles.version(table) if table else None)
+
+    # Same SQL, data version, pyramid version, coordinates and encoding always give the same bytes
+    etag = tile_encoding.variant_etag(tile_encoding.etag(key, z, x, y), accept_encoding, tile_encoding.ENCODING)
+    if tile_encoding.matches(if_none_match, etag):
+        return {"data": None, "etag": etag, "not_modified": True}
+
+    cached = await tile_cache.get(key, z, x, y)
+    if cached is not None:
+        return {"data": cached, "etag": etag, "not_modified": False}
+
+    # Neighbouring tiles are rendered together as one metatile at high zoom
+    size = _metatile_size(layer_data, z)
+    bx, by = x - x % size, y - y % size
+
+    # Single flight: concurrent requests for the same block share one render and one result buffer
+    flight = (key, z, bx, by, size)
+    task = _inflight.get(flight)
+    if task is None:
+        task = asyncio.ensure_future(_render(layer_data, key, z, bx, by, size))
+        _inflight[flight] = task
+        task.add_done_callback(lambda _: _inflight.pop(flight, None))
+    else:
+        _stats["coalesced"] += 1
+
+    # shield: a client that disconnects doesn't cancel the render others are waiting on
+    tiles = await asyncio.shield(task)
+    return {"data": tiles.get((x, y), b""), "etag": etag, "not_modified": False}
+
+
+def stats() -> dict:
+    return {"inflight": len(_inflight), **_stats}
+
+
+def _metatile_size(layer_data, z: int) -> int:
+    if z < METATILE_MIN_ZOOM or METATILE_SIZE <= 1:
+        return 1
+    if layer_data.get("filter_table") and layer_data.get("feature_ids") is not None:
+        return 1  # Served per tile from the pre-rendered pyramid
+    return METATILE_SIZE
+
+
+async def _render(layer_data, key: str, z: int, x: int, y: int, size: int) -> Dict[Tuple[int, int], bytes]:
+    """ Renders the size x size block at (x, y) and caches every tile (encoded). Returns {} if the query failed. """
+    _stats["rendered"] += 1
+    base_query = layer_data["sql"]
+    layer_name = layer_data["name"]
+
+    if size == 1 and layer_data.get("filter_table"):
+        # Subsets of a pre-rendered table: drop other features from the pyramid tile, no database.
+        # Decode, filter and re-encode are CPU-bound, so they run in the threadpool
+        filtered = await run_in_threadpool(_filtered_static_tile, layer_data, z, x, y)
+        if filtered is not None:
+            await tile_cache.put(key, z, {(x, y): filtered})
+            return {(x, y): filtered}
+
+    def build(source: str, geometry_source: Optional[str]) -> Tuple[str, Dict[str, int]]:
+        if size == 1:
+            return mvt_builder.build_mvt_query(source, layer_name, z, x, y, geometry_source)
+        return mvt_builder.build_metatile_query(source, layer_name, z, x, y, size, geometry_source)
+
+    # Build the MVT query (from the materialized table and precomputed geometry bands when there are some)
+    geometry_source = layer_data.get("geometry_source")
+    mvt_query = build(materialize.layer_sql(layer_data), geometry_source)
+
+    # Execute query to get MVT binary data
+    async with _db_slots:
+        rows = await execute_sql(*mvt_query)
+        if rows is None and (layer_data.get("materialized_table") or geometry_source):
+            # Materialization or band table dropped underneath us - fall back to the layer SQL
+            rows = await execute_sql(*build(base_query, None))
+    if rows is None:
+        # Query failed - serve empty tiles but don't cache the failure
+        return {}
+
+    if size == 1:
+        rows = [{"x": x, "y": y, **rows[0]}] if rows else []
+
+    # Compressed once here (in the threadpool, a metatile is up to N x N tiles); every later hit is served as-is
+    tiles = await run_in_threadpool(_encode_rows, rows)
+    await tile_cache.put(key, z, tiles)
+    return tiles
+
+
+def _encode_rows(rows) -> Dict[Tuple[int, int], bytes]:
+    return {
+        (row["x"], row["y"]): tile_encoding.encode(bytes(row["mvt"])) if row.get("mvt") else b""
+        for row in rows
+    }
+
+
+def _filtered_static_tile(layer_data, z: int, x: int, y: int) -> Optional[bytes]:
+    table = layer_data.get("filter_table")
+    feature_ids = layer_data.get("feature_ids")
+    if not table or feature_ids is None:
+        return None
+
+    max_zoom = static_tiles.max_zoom(table)
+    if max_zoom is None or z > max_zoom:
+        return None
+
+    tile = static_tiles.get_tile(table, z, x, y)
+    if tile is None:
+        return None
+    raw = tile_encoding.decode(tile, tile_encoding.sniff(tile))
+    return tile_encoding.encode(mvt_filter.filter_features(raw, feature_ids, layer_data["name"]))
+
+
+def _known_empty(layer_data, z: int, x: int, y: int) -> bool:
+    if "feature_count" not in layer_data:
+        return False  # Summary not computed yet (streamed layers)
+
+    if not layer_data["feature_count"]:
+        return True
+
+    if z < layer_data.get("minzoom", 0):
+        return True
+
+    bounds = layer_data.get("bounds")
+    return bool(bounds) and not mvt_builder.tile_intersects(bounds, z, x, y)
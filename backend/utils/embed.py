@@ -1,17 +1,96 @@
 import os
-from openai import OpenAI 
+import json
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import List
+
+from openai import OpenAI
+
+from db.db import execute_sql
 
 # --- Config ---
 EMBED_DIM = 1536
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_BATCH_SIZE = 256          # Inputs per embeddings request
+EMBED_CACHE_MAX_ENTRIES = 5000  # In-process LRU size
 
 # Intialize embedding client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# In-process LRU: text hash -> embedding
+_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+_lock = Lock()
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 # Generate Embedding
 def embed_text(text: str):
     """ Returns an embedding vector for a string. """
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
+    return embed_many([text])[0]
+
+def embed_many(texts: List[str]) -> List[List[float]]:
+    """
+    Returns embedding vectors for a list of strings, in order.
+    Lookups go memory LRU -> meta.embedding_cache -> batched API requests.
+    """
+    hashes = [text_hash(t) for t in texts]
+    found = {}
+
+    # 1. In-process cache
+    with _lock:
+        for h in hashes:
+            if h in _cache:
+                _cache.move_to_end(h)
+                found[h] = _cache[h]
+
+    # 2. Persistent cache
+    missing = list(dict.fromkeys(h for h in hashes if h not in found))
+    if missing:
+        found.update(_load_persisted(missing))
+
+    # 3. Embeddings API, batched
+    to_embed = list(dict.fromkeys(t for t, h in zip(texts, hashes) if h not in found))
+    new_vectors = {}
+    for i in range(0, len(to_embed), EMBED_BATCH_SIZE):
+        batch = to_embed[i:i + EMBED_BATCH_SIZE]
+        response = client.embeddings.create(model=EMBED_MODEL, input=batch)
+        for text, item in zip(batch, response.data):
+            new_vectors[text_hash(text)] = item.embedding
+
+    if new_vectors:
+        print(f"[Embed] {len(new_vectors)} new embedding(s) in {-(-len(to_embed) // EMBED_BATCH_SIZE)} request(s)")
+        _persist(new_vectors)
+        found.update(new_vectors)
+
+    with _lock:
+        for h in hashes:
+            _cache[h] = found[h]
+            _cache.move_to_end(h)
+        while len(_cache) > EMBED_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+    return [found[h] for h in hashes]
+
+def _load_persisted(hashes: List[str]) -> dict:
+    rows = execute_sql(
+        """
+        SELECT text_hash, embedding::text AS embedding
+        FROM meta.embedding_cache
+        WHERE model = %s AND text_hash = ANY(%s);
+        """,
+        (EMBED_MODEL, hashes),
+    )
+    return {r["text_hash"]: json.loads(r["embedding"]) for r in rows or []}
+
+def _persist(vectors: dict):
+    execute_sql(
+        """
+        INSERT INTO meta.embedding_cache (text_hash, model, embedding)
+        SELECT h, %s, e::vector
+        FROM unnest(%s::text[], %s::text[]) AS t(h, e)
+        ON CONFLICT (text_hash, model) DO NOTHING;
+        """,
+        (EMBED_MODEL, list(vectors.keys()), [json.dumps(v) for v in vectors.values()]),
     )
-    return response.data[0].embedding
\ No newline at end of file
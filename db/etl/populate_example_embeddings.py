@@ -6,7 +6,7 @@ import hashlib
 from openai import OpenAI
 from psycopg2.extras import RealDictCursor
 
-from utils.embed import embed
+from utils.embed import embed_many, ensure_cache_table
 
 # --- Config ---
 EMBED_DIM = 1536
@@ -129,6 +129,7 @@ if __name__ == "__main__":
                 paths.append(os.path.join(root, fname))
     
     ids = set()
+    pending = []  # (example, hash, is_new) needing an embedding
 
     for json_path in paths:
         example = _load_example(json_path)
@@ -139,15 +140,23 @@ if __name__ == "__main__":
 
         # Insert
         if ex_id not in db_snapshot:
-            emb_vector = embed(example["user_query"], client)
-            insert_example(conn, example, new_hash, emb_vector)
-            created += 1
+            pending.append((example, new_hash, True))
             continue
 
         # Exists, check hash
         old_hash = db_snapshot[ex_id]["file_hash"]
         if new_hash != old_hash:
-            emb_vector = embed(example["user_query"], client)
+            pending.append((example, new_hash, False))
+
+    # Embed all new/changed examples in batched requests
+    ensure_cache_table(conn)
+    vectors = embed_many([ex["user_query"] for ex, _, _ in pending], client, conn)
+
+    for (example, new_hash, is_new), emb_vector in zip(pending, vectors):
+        if is_new:
+            insert_example(conn, example, new_hash, emb_vector)
+            created += 1
+        else:
             update_example(conn, example, new_hash, emb_vector)
             updated += 1
         
@@ -2,7 +2,7 @@ import os
 import psycopg2
 from openai import OpenAI 
 
-from utils.embed import embed
+from utils.embed import embed_many, ensure_cache_table
 
 # --- Config ---
 EMBED_DIM = 1536
@@ -35,13 +35,19 @@ cur.execute(
 )
 columns = cur.fetchall()
 
-# Create embedding row
+# Build the text for each column, then embed them all in batched requests
+rows = []
 for schema, table, column, col_type, desc in columns:
     if col_type == "USER-DEFINED": col_type = "geometry"
     description = desc 
     text_to_embed = f"{table}.{column}: {description} (type: {col_type})"
-    vector = embed(text_to_embed, client)
+    rows.append((table, column, col_type, description, text_to_embed))
+
+ensure_cache_table(conn)
+vectors = embed_many([r[4] for r in rows], client, conn)
 
+# Create embedding row
+for (table, column, col_type, description, _), vector in zip(rows, vectors):
     cur.execute("""
         INSERT INTO meta.schema_embeddings (table_name, column_name, col_type, description, embedding)
         VALUES (%s, %s, %s, %s, %s)
@@ -1,8 +1,13 @@
 import os
+import gzip
+import math
+import sqlite3
 import importlib
 from datetime import datetime
 from sqlalchemy import create_engine, text
 
+from utils.index_advisor import advise
+
 user = os.getenv("POSTGRES_USER")
 pwd = os.getenv("POSTGRES_PASSWORD")
 host = os.getenv("DB_HOST", "db")
@@ -11,6 +16,55 @@ db = os.getenv("POSTGRES_DB")
 
 engine = create_engine(f"postgresql://{user}:{pwd}@{host}:{port}/{db}")
 
+# SCHEMA
+# Objects added after a database was first initialized (db/sql/init.sql only runs on a
+# fresh volume), created here before every command so existing databases catch up
+APP_ROLE = "user_app"
+ENSURE_SQL = [
+    # Precomputed tile geometry bands, written by the building_outlines/zoning/parks transforms
+    "CREATE SCHEMA IF NOT EXISTS tiles",
+    # Materialized layer results (unlogged tables in layer_cache, dropped after expires_at)
+    "CREATE SCHEMA IF NOT EXISTS layer_cache",
+    """CREATE TABLE IF NOT EXISTS meta.materialized_layers (
+        table_name TEXT PRIMARY KEY,
+        created TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        expires_at TIMESTAMPTZ NOT NULL
+    )""",
+    # Layer store shared by all backend workers (LAYER_STORE_BACKEND=postgres)
+    """CREATE TABLE IF NOT EXISTS meta.layers (
+        key TEXT PRIMARY KEY,
+        value JSONB NOT NULL,
+        expires_at TIMESTAMPTZ NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS layers_expires_at_idx ON meta.layers (expires_at)",
+    # Executed plans re-run by /plan/execute (plan store, LAYER_STORE_BACKEND=postgres)
+    """CREATE TABLE IF NOT EXISTS meta.plans (
+        key TEXT PRIMARY KEY,
+        value JSONB NOT NULL,
+        expires_at TIMESTAMPTZ NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS plans_expires_at_idx ON meta.plans (expires_at)",
+]
+APP_GRANTS = [
+    f"GRANT USAGE ON SCHEMA tiles TO {APP_ROLE}",
+    f"GRANT SELECT ON ALL TABLES IN SCHEMA tiles TO {APP_ROLE}",
+    f"ALTER DEFAULT PRIVILEGES IN SCHEMA tiles GRANT SELECT ON TABLES TO {APP_ROLE}",
+    f"GRANT SELECT, INSERT, UPDATE, DELETE ON meta.materialized_layers TO {APP_ROLE}",
+    f"GRANT USAGE, CREATE ON SCHEMA layer_cache TO {APP_ROLE}",
+    f"GRANT SELECT, INSERT, UPDATE, DELETE ON meta.layers TO {APP_ROLE}",
+    f"GRANT SELECT, INSERT, UPDATE, DELETE ON meta.plans TO {APP_ROLE}",
+]
+
+def ensure_schema():
+    with engine.begin() as conn:
+        for statement in ENSURE_SQL:
+            conn.execute(text(statement))
+
+        # Grants only where the app role exists (created by db/sql/init-users.sh)
+        if conn.execute(text("SELECT 1 FROM pg_roles WHERE rolname = :role"), {"role": APP_ROLE}).first():
+            for statement in APP_GRANTS:
+                conn.execute(text(statement))
+
 # Write dataframe to STAGING and update META
 def write_staging_with_meta(df, table_name, source_url):
     df.to_sql(table_name, engine, schema="staging", if_exists="replace", index=False)
@@ -66,10 +120,127 @@ def load_one_dataset(dataset_name):
                     conn.execute(text(file.read()))
                     conn.commit()
 
+    # Bumps the data version the backend keys cached tiles by
+    with engine.begin() as conn:
+        conn.execute(
+            text("""
+                INSERT INTO meta.datasets (dataset_name, last_loaded)
+                VALUES (:name, :ts)
+                ON CONFLICT (dataset_name) DO UPDATE
+                SET last_loaded = :ts
+            """),
+            {"name": dataset_name, "ts": datetime.utcnow()}
+        )
+
+# TILES
+# Pre-rendered MVT pyramids (MBTiles) for whole data.* tables, served by the backend
+# for layers that are a plain unfiltered table. Re-run after `load`.
+TILES_DIR = "tiles"
+TILES_MIN_ZOOM = 0
+TILES_MAX_ZOOM = 16
+
+def _tile_tolerance(z):
+    # Matches backend/core/mvt_builder.py _get_simplification_tolerance
+    if z <= 5: return 0.01
+    elif z <= 10: return 0.001
+    elif z <= 14: return 0.0001
+    else: return 0.000001
+
+def _tile_range(xmin, ymin, xmax, ymax, z):
+    """ XYZ tile column/row ranges covering a 4326 extent at zoom z. """
+    n = 2 ** z
+    def tx(lon): return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+    def ty(lat):
+        lat = max(-85.0511, min(85.0511, lat))
+        return min(n - 1, max(0, int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)))
+    return tx(xmin), tx(xmax), ty(ymax), ty(ymin)
+
+def tile_all_tables():
+    with engine.connect() as conn:
+        tables = conn.execute(text("""
+            SELECT table_name FROM information_schema.columns
+            WHERE table_schema = 'data' AND column_name = 'geometry'
+            INTERSECT
+            SELECT table_name FROM information_schema.columns
+            WHERE table_schema = 'data' AND column_name = 'id'
+            ORDER BY table_name
+        """)).scalars().all()
+    for table in tables:
+        tile_one_table(table)
+
+def tile_one_table(table):
+    print(f"[ETL|{table}] Rendering tiles z{TILES_MIN_ZOOM}-z{TILES_MAX_ZOOM} ...")
+    os.makedirs(TILES_DIR, exist_ok=True)
+    path = os.path.join(TILES_DIR, f"{table}.mbtiles")
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path): os.remove(tmp_path)
+
+    with engine.connect() as conn:
+        extent = conn.execute(text(f"""
+            SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e)
+            FROM (SELECT ST_Extent(geometry) AS e FROM data.{table}) AS extent
+        """)).one()
+        if extent[0] is None:
+            print(f"[ETL|{table}] No geometry, skipping")
+            return
+
+        mbtiles = sqlite3.connect(tmp_path)
+        mbtiles.executescript("""
+            CREATE TABLE metadata (name TEXT, value TEXT);
+            CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        """)
+
+        count = 0
+        for z in range(TILES_MIN_ZOOM, TILES_MAX_ZOOM + 1):
+            x0, x1, y0, y1 = _tile_range(*extent, z)
+            # One query per zoom: every tile over the table extent, rendered like the dynamic tiles
+            rows = conn.execute(text(f"""
+                WITH grid AS (
+                    SELECT x, y, ST_TileEnvelope(:z, x, y) AS envelope
+                    FROM generate_series(:x0, :x1) AS x, generate_series(:y0, :y1) AS y
+                )
+                SELECT grid.x, grid.y, (
+                    SELECT ST_AsMVT(tile_data, :name, 4096, 'geometry', 'id')
+                    FROM (
+                        SELECT t.id, ST_AsMVTGeom(
+                            ST_Transform(ST_SimplifyPreserveTopology(t.geometry, :tolerance), 3857),
+                            grid.envelope, 4096, 256, true
+                        ) AS geometry
+                        FROM data.{table} AS t
+                        WHERE t.geometry && ST_Transform(grid.envelope, 4326)
+                    ) AS tile_data
+                    WHERE tile_data.geometry IS NOT NULL
+                ) AS mvt
+                FROM grid
+            """), {"z": z, "x0": x0, "x1": x1, "y0": y0, "y1": y1, "name": table, "tolerance": _tile_tolerance(z)})
+
+            # MBTiles rows are TMS (y flipped); tiles are gzipped as usual for pbf MBTiles
+            tiles = [(z, x, 2 ** z - 1 - y, gzip.compress(bytes(mvt), mtime=0)) for x, y, mvt in rows if mvt]
+            mbtiles.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", tiles)
+            count += len(tiles)
+
+        xmin, ymin, xmax, ymax = extent
+        mbtiles.executemany("INSERT INTO metadata VALUES (?, ?)", [
+            ("name", table),
+            ("format", "pbf"),
+            ("minzoom", str(TILES_MIN_ZOOM)),
+            ("maxzoom", str(TILES_MAX_ZOOM)),
+            ("bounds", f"{xmin},{ymin},{xmax},{ymax}"),
+            ("generated", datetime.utcnow().isoformat()),
+        ])
+        mbtiles.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+        mbtiles.commit()
+        mbtiles.close()
+
+    # Swap in atomically so the backend never reads a half-written file
+    os.replace(tmp_path, path)
+    print(f"[ETL|{table}] Wrote {count} tiles to {path}")
+
 if __name__ == "__main__":
     import sys
 
     command = sys.argv[1]
+    ensure_schema()
 
     if command == "ingest":
         if len(sys.argv) == 2:
@@ -87,3 +258,14 @@ if __name__ == "__main__":
         else:
             print("Usage: python run_etl.py load [dataset_name]")
             sys.exit(1)
+    elif command == "tiles":
+        if len(sys.argv) == 2:
+            tile_all_tables()
+        elif len(sys.argv) == 3:
+            tile_one_table(sys.argv[2])
+        else:
+            print("Usage: python run_etl.py tiles [table_name]")
+            sys.exit(1)
+    elif command == "advise":
+        # Examples plus any backend query logs (logs/query_service.log) passed in
+        advise(engine, log_paths=sys.argv[2:])
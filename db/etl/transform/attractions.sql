@@ -22,6 +22,9 @@ FROM staging.attractions_raw;
 
 ALTER TABLE data.attractions ADD PRIMARY KEY (id);
 CREATE INDEX ON data.attractions USING GIST (geometry);
+-- Trigram indexes for ILIKE '%...%' filters (run_etl.py advise)
+CREATE INDEX ON data.attractions USING GIN (name gin_trgm_ops);
+CREATE INDEX ON data.attractions USING GIN (category gin_trgm_ops);
 
 -- Add descriptions
 COMMENT ON COLUMN data.attractions.id IS 'Unique identifier';
@@ -22,6 +22,8 @@ FROM staging.bike_lanes_raw;
 
 ALTER TABLE data.bike_lanes ADD PRIMARY KEY (id);
 CREATE INDEX ON data.bike_lanes USING GIST (geometry);
+-- Trigram indexes for ILIKE '%...%' filters (run_etl.py advise)
+CREATE INDEX ON data.bike_lanes USING GIN (lane_type gin_trgm_ops);
 
 -- Add descriptions
 COMMENT ON COLUMN data.bike_lanes.id IS 'Unique identifier';
@@ -31,3 +31,25 @@ COMMENT ON COLUMN data.building_outlines.objectid IS 'Unique ID of the feature';
 COMMENT ON COLUMN data.building_outlines.last_attribute_maint IS 'Date of the last attribute edit';
 COMMENT ON COLUMN data.building_outlines.last_geometry_maint IS 'Date of last geometry edit';
 COMMENT ON COLUMN data.building_outlines.geometry IS 'Geometry: polygon location of the building';
+
+
+-- Tile geometry bands: simplified, pre-projected (EPSG:3857) copies for MVT zoom bands
+-- (see backend/core/mvt_builder.py GEOMETRY_BANDS). Kept out of data.* so they aren't
+-- part of the schema the LLM sees.
+CREATE SCHEMA IF NOT EXISTS tiles;  -- Not in databases initialized before the bands existed
+DROP TABLE IF EXISTS tiles.building_outlines;
+CREATE TABLE tiles.building_outlines AS
+SELECT
+    id,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.01), 3857) AS geom_z5,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.001), 3857) AS geom_z10,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.0001), 3857) AS geom_z14,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.000001), 3857) AS geom_z22
+FROM data.building_outlines;
+
+ALTER TABLE tiles.building_outlines ADD PRIMARY KEY (id);
+CREATE INDEX ON tiles.building_outlines USING GIST (geom_z5);
+CREATE INDEX ON tiles.building_outlines USING GIST (geom_z10);
+CREATE INDEX ON tiles.building_outlines USING GIST (geom_z14);
+CREATE INDEX ON tiles.building_outlines USING GIST (geom_z22);
+ANALYZE tiles.building_outlines;
@@ -15,10 +15,34 @@ FROM staging.parks_raw;
 
 ALTER TABLE data.parks ADD PRIMARY KEY (id);
 CREATE INDEX ON data.parks USING GIST (geometry);
+-- Trigram index for ILIKE '%...%' filters (run_etl.py advise)
+CREATE INDEX ON data.parks USING GIN (amenities gin_trgm_ops);
 
 -- Add descriptions
 COMMENT ON COLUMN data.parks.id IS 'Unique identifier';
 COMMENT ON COLUMN data.parks.name IS 'Official park name';
 COMMENT ON COLUMN data.parks.type IS 'Category of park ';
 COMMENT ON COLUMN data.parks.amenities IS 'List of amenities in the park';
-COMMENT ON COLUMN data.parks.geometry IS 'Geometry: point location of the park';
\ No newline at end of file
+COMMENT ON COLUMN data.parks.geometry IS 'Geometry: point location of the park';
+
+
+-- Tile geometry bands: simplified, pre-projected (EPSG:3857) copies for MVT zoom bands
+-- (see backend/core/mvt_builder.py GEOMETRY_BANDS). Kept out of data.* so they aren't
+-- part of the schema the LLM sees.
+CREATE SCHEMA IF NOT EXISTS tiles;  -- Not in databases initialized before the bands existed
+DROP TABLE IF EXISTS tiles.parks;
+CREATE TABLE tiles.parks AS
+SELECT
+    id,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.01), 3857) AS geom_z5,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.001), 3857) AS geom_z10,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.0001), 3857) AS geom_z14,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.000001), 3857) AS geom_z22
+FROM data.parks;
+
+ALTER TABLE tiles.parks ADD PRIMARY KEY (id);
+CREATE INDEX ON tiles.parks USING GIST (geom_z5);
+CREATE INDEX ON tiles.parks USING GIST (geom_z10);
+CREATE INDEX ON tiles.parks USING GIST (geom_z14);
+CREATE INDEX ON tiles.parks USING GIST (geom_z22);
+ANALYZE tiles.parks;
@@ -12,6 +12,8 @@ FROM staging.schools_raw;
 
 ALTER TABLE data.schools ADD PRIMARY KEY (id);
 CREATE INDEX ON data.schools USING GIST (geometry);
+-- Trigram index for ILIKE '%...%' filters (run_etl.py advise)
+CREATE INDEX ON data.schools USING GIN (school_board_name gin_trgm_ops);
 
 -- Add descriptions
 COMMENT ON COLUMN data.schools.id IS 'Unique identifier';
@@ -16,6 +16,8 @@ FROM staging.gtfs_stops;
 
 ALTER TABLE data.transit_stops ADD PRIMARY KEY (id);
 CREATE INDEX ON data.transit_stops USING GIST (geometry);
+-- Trigram indexes for ILIKE '%...%' filters (run_etl.py advise)
+CREATE INDEX ON data.transit_stops USING GIN (name gin_trgm_ops);
 
 -- Add descriptions
 COMMENT ON COLUMN data.transit_stops.id IS 'Unique identifier';
@@ -17,6 +17,8 @@ FROM staging.zoning_raw;
 
 ALTER TABLE data.zoning ADD PRIMARY KEY (id);
 CREATE INDEX ON data.zoning USING GIST (geometry);
+-- Trigram indexes for ILIKE '%...%' filters (run_etl.py advise)
+CREATE INDEX ON data.zoning USING GIN (zone gin_trgm_ops);
 
 -- Add descriptions
 COMMENT ON COLUMN data.zoning.id IS 'Unique identifier';
@@ -26,3 +28,25 @@ COMMENT ON COLUMN data.zoning.max_units IS '	The permitted maximum number of Dwe
 COMMENT ON COLUMN data.zoning.full_zone_string IS 'Complete label of the zone.';
 COMMENT ON COLUMN data.zoning.zoning_exception IS 'This indicates whether a zone has an Exception. Yes (Y) or No (N)';
 COMMENT ON COLUMN data.zoning.geometry IS 'Geometry: polygon location of the zone';
+
+
+-- Tile geometry bands: simplified, pre-projected (EPSG:3857) copies for MVT zoom bands
+-- (see backend/core/mvt_builder.py GEOMETRY_BANDS). Kept out of data.* so they aren't
+-- part of the schema the LLM sees.
+CREATE SCHEMA IF NOT EXISTS tiles;  -- Not in databases initialized before the bands existed
+DROP TABLE IF EXISTS tiles.zoning;
+CREATE TABLE tiles.zoning AS
+SELECT
+    id,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.01), 3857) AS geom_z5,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.001), 3857) AS geom_z10,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.0001), 3857) AS geom_z14,
+    ST_Transform(ST_SimplifyPreserveTopology(geometry, 0.000001), 3857) AS geom_z22
+FROM data.zoning;
+
+ALTER TABLE tiles.zoning ADD PRIMARY KEY (id);
+CREATE INDEX ON tiles.zoning USING GIST (geom_z5);
+CREATE INDEX ON tiles.zoning USING GIST (geom_z10);
+CREATE INDEX ON tiles.zoning USING GIST (geom_z14);
+CREATE INDEX ON tiles.zoning USING GIST (geom_z22);
+ANALYZE tiles.zoning;
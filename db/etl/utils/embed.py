@@ -1,8 +1,85 @@
+import json
+import hashlib
+
+# --- Config ---
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_BATCH_SIZE = 256  # Inputs per embeddings request
+
+# In-process cache: text hash -> embedding
+_cache = {}
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 # Generate Embedding
-def embed(text: str, client):
+def embed(text: str, client, conn=None):
     """ Returns an embedding vector for a string. """
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
-    return response.data[0].embedding
\ No newline at end of file
+    return embed_many([text], client, conn)[0]
+
+def embed_many(texts, client, conn=None):
+    """
+    Returns embedding vectors for a list of strings, in order.
+    With a connection, vectors are also read from / written to meta.embedding_cache.
+    """
+    hashes = [text_hash(t) for t in texts]
+    found = {h: _cache[h] for h in hashes if h in _cache}
+
+    missing = list(dict.fromkeys(h for h in hashes if h not in found))
+    if missing and conn is not None:
+        found.update(_load_persisted(conn, missing))
+
+    to_embed = list(dict.fromkeys(t for t, h in zip(texts, hashes) if h not in found))
+    new_vectors = {}
+    requests = 0
+    for i in range(0, len(to_embed), EMBED_BATCH_SIZE):
+        batch = to_embed[i:i + EMBED_BATCH_SIZE]
+        response = client.embeddings.create(model=EMBED_MODEL, input=batch)
+        requests += 1
+        for text, item in zip(batch, response.data):
+            new_vectors[text_hash(text)] = item.embedding
+
+    if new_vectors and conn is not None:
+        _persist(conn, new_vectors)
+    found.update(new_vectors)
+    _cache.update(found)
+
+    print(f"[Embed] {len(texts)} text(s): {len(texts) - len(to_embed)} cached, {len(to_embed)} embedded in {requests} request(s)")
+    return [found[h] for h in hashes]
+
+def ensure_cache_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS meta.embedding_cache (
+                text_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                embedding VECTOR(1536) NOT NULL,
+                created TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (text_hash, model)
+            );
+        """)
+    conn.commit()
+
+def _load_persisted(conn, hashes):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT text_hash, embedding::text
+            FROM meta.embedding_cache
+            WHERE model = %s AND text_hash = ANY(%s)
+            """,
+            (EMBED_MODEL, hashes)
+        )
+        return {h: json.loads(e) for h, e in cur.fetchall()}
+
+def _persist(conn, vectors):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO meta.embedding_cache (text_hash, model, embedding)
+            SELECT h, %s, e::vector
+            FROM unnest(%s::text[], %s::text[]) AS t(h, e)
+            ON CONFLICT (text_hash, model) DO NOTHING
+            """,
+            (EMBED_MODEL, list(vectors.keys()), [json.dumps(v) for v in vectors.values()])
+        )
+    conn.commit()
@@ -0,0 +1,145 @@
+import json
+import os
+import re
+from collections import defaultdict
+
+from sqlalchemy import text
+
+# Operators whose leading-wildcard patterns a btree can't serve but a pg_trgm GIN index can
+PATTERN_OPERATORS = {"ILIKE", "NOT ILIKE", "LIKE", "NOT LIKE"}
+
+# query_service logs every executed plan as: "... | [<request id>] Plan: {json}"
+LOG_PLAN = re.compile(r"\] Plan: (\{.*\})\s*$")
+
+# --- Plan collection ---
+def load_example_plans(examples_dir="examples"):
+    plans = []
+    for file in sorted(os.listdir(examples_dir)):
+        if file.endswith(".json"):
+            with open(os.path.join(examples_dir, file)) as f:
+                plans.append(("example " + file, json.load(f)["plan"]))
+    return plans
+
+def load_logged_plans(log_paths):
+    plans = []
+    for path in log_paths:
+        with open(path) as f:
+            for line_no, line in enumerate(f, 1):
+                match = LOG_PLAN.search(line)
+                if not match:
+                    continue
+                try:
+                    plans.append((f"{os.path.basename(path)}:{line_no}", json.loads(match.group(1))))
+                except json.JSONDecodeError:
+                    continue
+    return plans
+
+# --- Predicate extraction ---
+def _select_queries(query):
+    """ Every SELECT-shaped query object inside a layer query (CTEs and unions included). """
+    query_type = query.get("type", "select")
+    if query_type == "cte":
+        for cte in query.get("ctes", []):
+            yield from _select_queries(cte["query"])
+        yield from _select_queries(query.get("main_query", {}))
+    elif query_type == "union":
+        for sub_query in query.get("queries", []):
+            yield from _select_queries(sub_query)
+    else:
+        yield query
+
+def _resolve(column, query):
+    """ (table, column) for a possibly alias-qualified filter column. """
+    aliases = {query.get("alias", query.get("table")): query.get("table")}
+    for join in query.get("joins", []):
+        aliases[join.get("alias", join.get("table"))] = join.get("table")
+
+    prefix, _, name = column.rpartition(".")
+    table = aliases.get(prefix) if prefix else query.get("table")
+    return table, name
+
+def _filter_lists(query):
+    """ (filters, scope) for every filter list of a query, scope being the query its columns resolve against. """
+    # Base and join-side filters share the WHERE clause, and _resolve maps join aliases to their tables
+    yield query.get("filters") or [], query
+
+    # Spatial filter targets are filtered inside their own EXISTS/subquery, against the target table
+    for sf in query.get("spatial_filters") or []:
+        if "target_filters" in sf:
+            target_filters = sf["target_filters"] or []
+        elif "target_filter" in sf:
+            target_filters = [sf["target_filter"]]
+        else:
+            continue
+        yield target_filters, {"table": sf.get("target_table")}
+
+def pattern_predicates(plans):
+    """ {(table, column): {"count": n, "sample": value, "sources": set}} for pattern filters. """
+    found = defaultdict(lambda: {"count": 0, "sample": None, "sources": set()})
+    for source, plan in plans:
+        for layer in plan.get("layers", []):
+            for query in _select_queries(layer.get("query", {})):
+                for filters, scope in _filter_lists(query):
+                    for f in filters:
+                        if f.get("operator", "").upper() not in PATTERN_OPERATORS:
+                            continue
+                        table, column = _resolve(f["column"], scope)
+                        if not table or not re.fullmatch(r"[a-z_][a-z0-9_]*", column):
+                            continue
+                        entry = found[(table, column)]
+                        entry["count"] += 1
+                        entry["sample"] = entry["sample"] or f.get("value")
+                        entry["sources"].add(source)
+    return found
+
+# --- Database checks ---
+def trigram_indexed(conn, table, column):
+    rows = conn.execute(text("""
+        SELECT indexdef FROM pg_indexes
+        WHERE schemaname = 'data' AND tablename = :table AND indexdef ILIKE '%gin_trgm_ops%'
+    """), {"table": table}).scalars().all()
+    return any(re.search(rf"\(\s*\"?{column}\"?\s+gin_trgm_ops", d) for d in rows)
+
+def explain_pattern(conn, table, column, sample):
+    """ (total cost, uses an index) for the predicate on its own. """
+    plan = conn.execute(
+        text(f"EXPLAIN (FORMAT JSON) SELECT id FROM data.{table} WHERE {column} ILIKE :value"),
+        {"value": sample or "%a%"},
+    ).scalar()
+    plan = plan[0]["Plan"] if isinstance(plan, list) else json.loads(plan)[0]["Plan"]
+
+    node_types = []
+    def walk(node):
+        node_types.append(node["Node Type"])
+        for child in node.get("Plans", []):
+            walk(child)
+    walk(plan)
+    return plan["Total Cost"], any("Index" in n or "Bitmap" in n for n in node_types)
+
+def advise(engine, log_paths=(), examples_dir="examples"):
+    plans = load_example_plans(examples_dir) + load_logged_plans(log_paths)
+    predicates = pattern_predicates(plans)
+    print(f"[Advise] {len(plans)} plan(s), {len(predicates)} pattern-filtered column(s)")
+
+    suggestions = []
+    with engine.connect() as conn:
+        for (table, column), info in sorted(predicates.items(), key=lambda kv: -kv[1]["count"]):
+            try:
+                indexed = trigram_indexed(conn, table, column)
+                cost, uses_index = explain_pattern(conn, table, column, info["sample"])
+            except Exception as e:
+                conn.rollback()
+                print(f"- data.{table}.{column}: skipped ({str(e).splitlines()[0]})")
+                continue
+
+            status = "trigram indexed" if indexed else "NOT INDEXED"
+            plan_note = "index scan" if uses_index else "seq scan"
+            print(f"- data.{table}.{column}: {info['count']} use(s), {status}, {plan_note}, cost {cost:.0f} (e.g. {info['sample']!r})")
+            if not indexed:
+                suggestions.append(f"CREATE INDEX ON data.{table} USING GIN ({column} gin_trgm_ops);")
+
+    if suggestions:
+        print("\n[Advise] Suggested indexes (add to the table's transform/*.sql):")
+        for statement in suggestions:
+            print("    " + statement)
+    return suggestions
@@ -31,10 +31,12 @@ END
 GRANT ALL PRIVILEGES ON SCHEMA staging TO user_etl;
 GRANT ALL PRIVILEGES ON SCHEMA data TO user_etl;
 GRANT ALL PRIVILEGES ON SCHEMA meta TO user_etl;
+GRANT ALL PRIVILEGES ON SCHEMA tiles TO user_etl;
 
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA staging TO user_etl;
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA data TO user_etl;
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA meta TO user_etl;
+GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA tiles TO user_etl;
 
 GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA staging TO user_etl;
 GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA data TO user_etl;
@@ -47,6 +49,15 @@ GRANT SELECT ON ALL TABLES IN SCHEMA data TO user_app;
 GRANT USAGE ON ALL SEQUENCES IN SCHEMA data TO user_app;
 GRANT SELECT ON ALL TABLES IN SCHEMA meta TO user_app;
 GRANT USAGE ON ALL SEQUENCES IN SCHEMA meta TO user_app;
+GRANT USAGE ON SCHEMA tiles TO user_app;
+GRANT SELECT ON ALL TABLES IN SCHEMA tiles TO user_app;
+
+-- App-managed caches (written by the backend)
+GRANT SELECT, INSERT ON meta.embedding_cache TO user_app;
+GRANT SELECT, INSERT, UPDATE, DELETE ON meta.materialized_layers TO user_app;
+GRANT SELECT, INSERT, UPDATE, DELETE ON meta.layers TO user_app;
+GRANT SELECT, INSERT, UPDATE, DELETE ON meta.plans TO user_app;
+GRANT USAGE, CREATE ON SCHEMA layer_cache TO user_app;
 
 -- 4. Default privileges for future tables/sequences created by ETL
 ALTER DEFAULT PRIVILEGES FOR ROLE user_etl IN SCHEMA data
@@ -57,6 +68,8 @@ ALTER DEFAULT PRIVILEGES FOR ROLE user_etl IN SCHEMA meta
     GRANT SELECT ON TABLES TO user_app;
 ALTER DEFAULT PRIVILEGES FOR ROLE user_etl IN SCHEMA meta
     GRANT USAGE ON SEQUENCES TO user_app;
+ALTER DEFAULT PRIVILEGES FOR ROLE user_etl IN SCHEMA tiles
+    GRANT SELECT ON TABLES TO user_app;
 
 ALTER DEFAULT PRIVILEGES FOR ROLE user_etl IN SCHEMA staging
     GRANT ALL ON TABLES TO user_etl;
@@ -1,8 +1,11 @@
 CREATE EXTENSION IF NOT EXISTS vector;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 CREATE SCHEMA IF NOT EXISTS staging;
 CREATE SCHEMA IF NOT EXISTS data;
 CREATE SCHEMA IF NOT EXISTS meta;
+CREATE SCHEMA IF NOT EXISTS layer_cache;
+CREATE SCHEMA IF NOT EXISTS tiles;
 
 CREATE TABLE IF NOT EXISTS meta.datasets (
     dataset_name text PRIMARY KEY,
@@ -35,4 +38,36 @@ CREATE TABLE IF NOT EXISTS meta.example_embeddings (
     embedding_version INT NOT NULL DEFAULT 1,
     last_embedded TIMESTAMP,
     file_hash TEXT  -- stores hash of the JSON file for change detection
-);
\ No newline at end of file
+);
+
+-- Embedding cache (content-addressed by text hash and model)
+CREATE TABLE IF NOT EXISTS meta.embedding_cache (
+    text_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    embedding VECTOR(1536) NOT NULL,
+    created TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (text_hash, model)
+);
+
+-- Materialized layer results (unlogged tables in layer_cache, dropped after expires_at)
+CREATE TABLE IF NOT EXISTS meta.materialized_layers (
+    table_name TEXT PRIMARY KEY,
+    created TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- Layer store shared by all backend workers (LAYER_STORE_BACKEND=postgres)
+CREATE TABLE IF NOT EXISTS meta.layers (
+    key TEXT PRIMARY KEY,
+    value JSONB NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS layers_expires_at_idx ON meta.layers (expires_at);
+
+-- Executed plans re-run by /plan/execute (plan store, LAYER_STORE_BACKEND=postgres)
+CREATE TABLE IF NOT EXISTS meta.plans (
+    key TEXT PRIMARY KEY,
+    value JSONB NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plans_expires_at_idx ON meta.plans (expires_at);
@@ -7,6 +7,20 @@ import MoreInfoModal from "./components/MoreInfoModal"
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL || "";
 
+// Map rows with IDs for table display
+// Use the actual 'id' from the database query results
+function mapRows(layer, rows, layerIdx, offset) {
+  return rows?.map((r, i) => {
+    const rowObj = Object.fromEntries(layer.columns.map((c, j) => [c, r[j]]));
+    // Ensure we have an id field from the query
+    if (!rowObj.id) {
+      console.warn(`Row ${offset + i} in layer ${layer.name} missing 'id' field`);
+      rowObj.id = `${layerIdx}-${offset + i}`; // Fallback to synthetic ID
+    }
+    return rowObj;
+  }) || [];
+}
+
 export default function App() {
   const [query, setQuery] = useState("");
   const [layers, setLayers] = useState([]);
@@ -54,24 +68,10 @@ export default function App() {
         throw new Error("Invalid response: no layers found");
       }
 
-      const layersWithIds = data.layers.map((layer, layerIdx) => {
-        // Map rows with IDs for table display
-        // Use the actual 'id' from the database query results
-        const mappedRows = layer.rows?.map((r, i) => {
-          const rowObj = Object.fromEntries(layer.columns.map((c, j) => [c, r[j]]));
-          // Ensure we have an id field from the query
-          if (!rowObj.id) {
-            console.warn(`Row ${i} in layer ${layer.name} missing 'id' field`);
-            rowObj.id = `${layerIdx}-${i}`; // Fallback to synthetic ID
-          }
-          return rowObj;
-        }) || [];
-
-        return {
-          ...layer,
-          rows: mappedRows,
-        }
-      })
+      const layersWithIds = data.layers.map((layer, layerIdx) => ({
+        ...layer,
+        rows: mapRows(layer, layer.rows, layerIdx, 0),
+      }))
 
       setLayers(layersWithIds);
       setSelectedLayerIndex(0);
@@ -85,6 +85,28 @@ export default function App() {
     }
   }
 
+  // Fetch the next keyset page of a layer's attribute rows and append it
+  const loadMoreRows = async (layerIdx) => {
+    const layer = layers[layerIdx];
+    if (!layer || layer.next_cursor == null || !layer.rows_url) return;
+
+    try {
+      const res = await fetch(`${API_BASE}${layer.rows_url}?after=${encodeURIComponent(layer.next_cursor)}`);
+      if (!res.ok) {
+        throw new Error(`Server responded with ${res.status}`);
+      }
+
+      const page = await res.json();
+      setLayers((prev) => prev.map((l, i) => i !== layerIdx ? l : {
+        ...l,
+        rows: [...l.rows, ...mapRows(l, page.rows, layerIdx, l.rows.length)],
+        next_cursor: page.next_cursor,
+      }));
+    } catch (err) {
+      console.error(err);
+    }
+  }
+
   return (
     <div className="w-screen h-screen relative overflow-hidden">
 
@@ -147,6 +169,7 @@ export default function App() {
           setResultsSize={setResultsSize}
           selectedFeatureId={selectedFeatureId}
           onRowClick={setSelectedFeatureId}
+          onLoadMore={loadMoreRows}
         />
       </div>
     </div>
@@ -53,6 +53,8 @@ export default function MapView({ layers, selectedFeatureId, onFeatureClick }) {
       // Add new layers
       layers.forEach((layer, i) => {
         if (!layer.tile_url) return
+        // Layer IDs are content-addressed: an identical layer repeated in one plan shares a source
+        if (mapInstance.getSource(layer.layer_id)) return
 
         const baseUrl = API_BASE || window.location.origin
         const tileUrl = layer.tile_url.startsWith('http') 
@@ -62,11 +64,13 @@ export default function MapView({ layers, selectedFeatureId, onFeatureClick }) {
         const colour = layerColours[i % layerColours.length]
 
         // Add source
+        // Bounds and zoom range from the backend summary skip requests for tiles with no data
         mapInstance.addSource(layer.layer_id, {
           type: "vector",
           tiles: [tileUrl],
-          minzoom: 0,
-          maxzoom: 22
+          minzoom: layer.minzoom ?? 0,
+          maxzoom: layer.maxzoom ?? 22,
+          ...(layer.bounds ? { bounds: layer.bounds } : {})
         })
 
         // Add fill layer for polygons
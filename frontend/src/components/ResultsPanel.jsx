@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef } from "react"
 
-export default function ResultsPanel({ layers, resultsSize, setResultsSize, selectedFeatureId, onRowClick }) {
+export default function ResultsPanel({ layers, resultsSize, setResultsSize, selectedFeatureId, onRowClick, onLoadMore }) {
   if (!layers || layers.length === 0) return null
 
   const [expandedLayers, setExpandedLayers] = useState(() =>
@@ -13,6 +13,9 @@ export default function ResultsPanel({ layers, resultsSize, setResultsSize, sele
 
   const rowRefs = useRef({})
 
+  // Rows are paged, so counts come from the layer summary
+  const featureCount = (layer) => layer.feature_count ?? layer.rows.length
+
   useEffect(() => {
     if (selectedFeatureId != null && rowRefs.current[selectedFeatureId]) {
       rowRefs.current[selectedFeatureId].scrollIntoView({
@@ -37,7 +40,7 @@ export default function ResultsPanel({ layers, resultsSize, setResultsSize, sele
       {/* Header */}
       <div className="flex justify-between items-center bg-zinc-900 px-4 py-2 rounded-t-xl border-b border-zinc-700 flex-shrink-0">
         <h2 className="font-bold text-xs md:text-sm">
-          {layers.reduce((sum, l) => sum + l.rows.length, 0)} Results in {layers.length} layers
+          {layers.reduce((sum, l) => sum + featureCount(l), 0)} Results in {layers.length} layers
         </h2>
         <div className="space-x-2">
           <button onClick={() => setResultsSize("collapsed")} className="bg-zinc-600 px-2 py-1 rounded text-xs">Collapse</button>
@@ -48,7 +51,7 @@ export default function ResultsPanel({ layers, resultsSize, setResultsSize, sele
 
       {/* Scrollable Content */}
       <div className="overflow-auto flex-1 divide-y divide-zinc-700">
-        {layers.map((layer) => (
+        {layers.map((layer, layerIdx) => (
           <div key={layer.name}>
             {/* Layer header */}
             <div
@@ -56,7 +59,7 @@ export default function ResultsPanel({ layers, resultsSize, setResultsSize, sele
               onClick={() => toggleLayer(layer.name)}
             >
               <span className="font-semibold text-xs md:text-sm">
-                {layer.name} ({layer.rows.length})
+                {layer.name} ({featureCount(layer)})
               </span>
               <span className="text-xs">{expandedLayers[layer.name] ? "▽" : "▷"}</span>
             </div>
@@ -95,6 +98,14 @@ export default function ResultsPanel({ layers, resultsSize, setResultsSize, sele
                     ))}
                   </tbody>
                 </table>
+                {layer.next_cursor != null && (
+                  <button
+                    onClick={() => onLoadMore(layerIdx)}
+                    className="w-full bg-zinc-700 hover:bg-zinc-600 px-3 py-1 text-xs"
+                  >
+                    Showing {layer.rows.length} of {featureCount(layer)} - Load more
+                  </button>
+                )}
               </div>
             )}
           </div>